@@ -2,6 +2,7 @@
 
 This script walks through a folder of images, runs the detector and displays the results including boxes.
 You can use the keyboard to move forwards of backwards, frame by frame or in larger steps.
+The next images are read and analyzed in the background, and the results are cached (see 'prefetcher.py').
 
 SLW Oct-2024
 """
@@ -9,11 +10,15 @@ SLW Oct-2024
 import os
 import cv2
 import detector
+import detector_server
+import prefetcher
+import renderer
 
 # Directories
 project_dir = "micro-organisms"
 image_dir = "images"
 model_dir = "model"
+server_address = None   # e.g. "localhost:8555" to use a shared detector server (see 'detector_server.py')
 
 # Print instructions
 print("Analyze images ...")
@@ -30,10 +35,16 @@ model_path = os.path.join(project_dir, model_dir)
 threshold = 0.5
 image_height, image_width = 768, 1024
 image_step = 10
+prefetch_ahead = 3                 # number of images loaded in advance
+cache_bytes = 512 * 1024 * 1024    # memory for images already shown or loaded
 
 # Detector
 print("Starting detector ...")
-dtc = detector.Detector(model_path)
+if server_address is None:
+    dtc = detector.Detector(model_path)
+else:
+    dtc = detector_server.DetectorClient(server_address)
+rnd = renderer.Renderer(dtc.labels)
 
 # Image directory
 print("Reading image directory ...")
@@ -44,28 +55,34 @@ pnt = 0
 print(files_cnt, "images found")
 print()
 
-while True:
-    # Read image
-    f = image_files[pnt]
-    print(str(pnt + 1) + ": " + f)
-    img = cv2.imread(os.path.join(image_path, f))
+def load_image(idx):
+    """ Reads an image, runs the detector and adds the boxes. Runs in the prefetch thread. """
+    img = cv2.imread(os.path.join(image_path, image_files[idx]))
+    resized = False
     height, width = img.shape[:2]
     if width > image_width:
         img = cv2.resize(img, (image_width, height * image_width // width))
-        print("   - image resized")
+        resized = True
         height, width = img.shape[:2]
     if height > image_height:
         img = cv2.resize(img, (width * image_height // height, image_height))
-        print("   - image resized")
+        resized = True
     # Find objects
     boxes, classes, scores = dtc.detect_objects(img)
     # Add boxes
-    for i in range(10):
-        if scores[i] > threshold:
-            img = dtc.add_box(img, boxes[i],
-                              dtc.labels[classes[i]] + ": " + str(round(scores[i]*100)) + '%')
-        else:
-            break
+    img = rnd.draw_detections(img, boxes, classes, scores, threshold)
+    return img, resized
+
+# The next images are loaded in the background
+prefetch = prefetcher.Prefetcher(load_image, files_cnt, prefetch_ahead, image_step, cache_bytes)
+
+while True:
+    # Read image
+    f = image_files[pnt]
+    print(str(pnt + 1) + ": " + f)
+    img, resized = prefetch.get(pnt)
+    if resized:
+        print("   - image resized")
     # Show the image and wait for a key pressed
     cv2.imshow("", img)
     key = cv2.waitKey(0) & 0xff
@@ -95,5 +112,6 @@ while True:
             break
 
 # Clean up
+prefetch.close()
 cv2.destroyAllWindows()
 print("Done!")
@@ -5,6 +5,10 @@ The results are dispalyed with bounding boxes, labels and scores.
 You can use the keyboard keys <esc>, <return> or <q> to cancel the presentation.
 
 The script requires the class detector.py
+If 'record_file' is set, the detections are saved to a detection store (see 'detection_store.py'),
+which can be searched and played back with 'play_detections.py' without running the detector again.
+With 'show_video' = False, the video is only analyzed and recorded (as fast as possible).
+Set the environment variable TFOD_METRICS (e.g. "summary") to see where the time goes (see 'metrics.py').
 
 SLW Jan-2025
 """
@@ -12,6 +16,10 @@ SLW Jan-2025
 import os
 import cv2
 import detector
+import detector_server
+import renderer
+import detection_store
+import metrics
 import time
 import sys
 
@@ -20,6 +28,9 @@ video_file = "<my_video_file.mp4>"
 project_dir = "<my_project>"
 video_dir = "<my_video_folder>"
 model_dir = "model"
+server_address = None   # e.g. "localhost:8555" to use a shared detector server (see 'detector_server.py')
+record_file = None      # e.g. "<my_video_file>.detections.npz" to save the detections (in the video folder)
+show_video = True
 
 # Print instructions
 print("Analyze video stream")
@@ -39,10 +50,15 @@ if not os.path.isdir(model_path):
 # Constants
 threshold = 0.75  #  Detector threshold
 delay = 0.025     # delay time between displayed frames
+display_size = None  # e.g. (1280, 720) to draw and show a downscaled copy of the frames
 
 # Detector
 print("Starting detector ...")
-dtc = detector.Detector(model_path)
+if server_address is None:
+    dtc = detector.Detector(model_path)
+else:
+    dtc = detector_server.DetectorClient(server_address)
+rnd = renderer.Renderer(dtc.labels)
 
 # Opening video stream
 if not os.path.isfile(os.path.join(project_dir, video_dir, video_file)):
@@ -62,16 +78,28 @@ print("Frame count:", int(frame_cnt))
 print("Frame size:", int(video_stream.get(3)), '*', int(video_stream.get(4)))
 print()
 
+# Detection store
+store = None
+if record_file is not None:
+    store = detection_store.DetectionStore(dtc.labels, fps=frame_ps, source=video_file)
+frame_no = 0
+
 error_cnt = 0
 running = True
 print("Press <return> or <esc> for exit.")
 
 while running:
     # get image from the video stream
-    success, img = video_stream.read()
+    with metrics.timer("decode"):
+        success, img = video_stream.read()
     if not success:
+        if store is not None and frame_no >= frame_cnt:
+            # end of the video
+            running = False
+            continue
         # if not successful, handle error
         print("Failed to grab frame!")
+        metrics.count("grab_errors")
         error_cnt += 1
         if error_cnt > 10:
             print("Too many errors ... exiting program!")
@@ -81,16 +109,21 @@ while running:
         error_cnt = 0
         # detect objects
         boxes, classes, scores = dtc.detect_objects(img)
-        # add boxes to the image
-        for idx in range(10):
-            if scores[idx] >= threshold:
-               img = dtc.add_box(img, boxes[idx],
-                                 dtc.labels[classes[idx]] + ": " + str(round(scores[idx]*100)) + '%')
-            else:
-                break
+        frame_no = int(video_stream.get(1))   # position of the next frame
+        if store is not None:
+            store.add(frame_no - 1, boxes, classes, scores)
+        if not show_video:
+            if frame_no % 100 == 0:
+                print("- frame", frame_no, "of", int(frame_cnt), end='\r')
+            continue
+        # add boxes to the image (or to a downscaled copy for display)
+        with metrics.timer("render"):
+            img = rnd.draw_detections(img, boxes, classes, scores, threshold, display_size=display_size,
+                                      inclusive=True)
         # show the image and get key from keyboard
-        cv2.imshow(project_dir, img)
-        key = cv2.waitKey(1) & 0xff
+        with metrics.timer("display"):
+            cv2.imshow(project_dir, img)
+            key = cv2.waitKey(1) & 0xff
         # process key
         if key in (13, 27, 113): # codes for <return>, <esc>, <q>
             running = False
@@ -99,6 +132,9 @@ while running:
 
 # Done!
 print()
+if store is not None:
+    store.save(os.path.join(video_path, record_file))
+    print(frame_no, "frames recorded in", store.run_count, "runs to '" + record_file + "'")
 print("Closing video stream")
 video_stream.release()
 cv2.destroyAllWindows()
@@ -0,0 +1,134 @@
+""" annotation.py
+
+Helper functions to read and write Pascal VOC annotation files (*.xml) as written by labelImg.
+The parser follows the same simple tag scanning as 'evaluator.py', but it walks through
+the XML string by position instead of cutting the string after each tag.
+
+Functions:
+- read_annotation() - returns image filename, image size, classes and boxes (in pixel)
+- write_annotation() - writes an annotation file in the format of labelImg
+- to_pixel() - converts a normalized box of the detector into pixel coordinates
+
+Dependencies: none
+
+SLW Oct-2026
+"""
+
+import os
+from xml.sax.saxutils import escape, unescape
+
+
+def _find_tag(s, tag, start=0):
+    """ Finds a single tag in an XML string, starting at position 'start'.
+        Returns the content of the tag and the position after the closing tag. """
+    start_pos = s.find("<" + tag + ">", start)
+    if start_pos < 0:
+        return "", -1
+    end_pos = s.find("</" + tag + ">", start_pos)
+    if end_pos < 0:
+        return "", -1
+    return s[start_pos + len(tag) + 2 : end_pos], end_pos + len(tag) + 3
+
+
+def read_annotation(xml_file):
+    """ Reads a Pascal VOC XML file.
+        Returns image filename, width, height, list of classes and list of boxes.
+        Boxes are tuples of pixel coordinates (xmin, ymin, xmax, ymax).
+        In case of an error, the image filename is "none". """
+    fname = "read_annotation: "
+    with open(xml_file, "r") as f:
+        s = f.read()
+    img_filename, pos = _find_tag(s, "filename")
+    if len(img_filename) == 0 or pos <= 0:
+        print(fname + "Error: can't find filename-tag in '" + os.path.basename(xml_file) + "'!")
+        return "none", 0, 0, [], []
+    width, pos = _find_tag(s, "width", pos)
+    if len(width) == 0 or pos <= 0:
+        print(fname + "Error: can't find width-tag in '" + os.path.basename(xml_file) + "'!")
+        return "none", 0, 0, [], []
+    height, pos = _find_tag(s, "height", pos)
+    if len(height) == 0 or pos <= 0:
+        print(fname + "Error: can't find height-tag in '" + os.path.basename(xml_file) + "'!")
+        return "none", 0, 0, [], []
+    width, height = int(width), int(height)
+    img_filename = unescape(img_filename)
+    # Extract classes and boxes
+    classes = []
+    boxes = []
+    while True:
+        class_name, pos = _find_tag(s, "name", pos)
+        if len(class_name) == 0 or pos <= 0:
+            break
+        coords = []
+        for tag in ("xmin", "ymin", "xmax", "ymax"):
+            value, pos = _find_tag(s, tag, pos)
+            if len(value) == 0 or pos <= 0:
+                print(fname + "Error: can't find " + tag + "-tag in '" + os.path.basename(xml_file) + "'!")
+                return img_filename, width, height, classes, boxes
+            coords.append(int(float(value)))
+        classes.append(unescape(class_name))
+        boxes.append(tuple(coords))
+    return img_filename, width, height, classes, boxes
+
+
+def to_pixel(box, width, height):
+    """ Converts a normalized box (ymin, xmin, ymax, xmax) as returned by the detector
+        into pixel coordinates (xmin, ymin, xmax, ymax) within the image """
+    xmin = min(width, max(1, int(round(box[1] * width))))
+    ymin = min(height, max(1, int(round(box[0] * height))))
+    xmax = min(width, max(xmin, int(round(box[3] * width))))
+    ymax = min(height, max(ymin, int(round(box[2] * height))))
+    return xmin, ymin, xmax, ymax
+
+
+def write_annotation(xml_file, img_filename, width, height, classes, boxes, folder="images", depth=3):
+    """ Writes a Pascal VOC XML file in the format of labelImg.
+        Boxes are tuples of pixel coordinates (xmin, ymin, xmax, ymax).
+        The file is written to a temporary file first and then renamed, so there is never a partial XML file. """
+    lines = ["<annotation>",
+             "\t<folder>" + escape(folder) + "</folder>",
+             "\t<filename>" + escape(img_filename) + "</filename>",
+             "\t<path>" + escape(img_filename) + "</path>",
+             "\t<source>",
+             "\t\t<database>Unknown</database>",
+             "\t</source>",
+             "\t<size>",
+             "\t\t<width>" + str(width) + "</width>",
+             "\t\t<height>" + str(height) + "</height>",
+             "\t\t<depth>" + str(depth) + "</depth>",
+             "\t</size>",
+             "\t<segmented>0</segmented>"]
+    for c, (xmin, ymin, xmax, ymax) in zip(classes, boxes):
+        lines += ["\t<object>",
+                  "\t\t<name>" + escape(c) + "</name>",
+                  "\t\t<pose>Unspecified</pose>",
+                  "\t\t<truncated>0</truncated>",
+                  "\t\t<difficult>0</difficult>",
+                  "\t\t<bndbox>",
+                  "\t\t\t<xmin>" + str(xmin) + "</xmin>",
+                  "\t\t\t<ymin>" + str(ymin) + "</ymin>",
+                  "\t\t\t<xmax>" + str(xmax) + "</xmax>",
+                  "\t\t\t<ymax>" + str(ymax) + "</ymax>",
+                  "\t\t</bndbox>",
+                  "\t</object>"]
+    lines.append("</annotation>")
+    tmp_file = xml_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_file, xml_file)
+
+
+#====================================================================================
+
+if __name__ == "__main__":
+
+    # Files and directories
+    xml_file = "paramecium_caudatum_Snap-620.xml"
+    project_dir = "micro-organisms"
+    image_dir = "images"
+
+    img_filename, width, height, classes, boxes = read_annotation(
+        os.path.join(project_dir, image_dir, xml_file))
+    print("Image:", img_filename, width, 'x', height)
+    for c, b in zip(classes, boxes):
+        print("-", c, b)
@@ -0,0 +1,186 @@
+""" benchmark_detector.py
+
+Micro-benchmark for the class Detector. It times the steps of the detector separately:
+  - preprocess (color conversion, resize, normalization)
+  - invoke (the interpreter)
+  - outputs (extraction of boxes, classes and scores)
+  - add_box (one call per detection) and renderer (all detections at once, see 'renderer.py')
+  - detect_objects_batch for different batch sizes (throughput)
+for different image sizes. It reports the percentiles p50, p95 and p99 in ms, the throughput in frames per second
+and the peak memory (RSS) of the process.
+
+The model is either a trained model (model folder with detect.tflite and labelmap.txt)
+or a small synthetic SSD-style model with the same outputs, which is built with tensorflow.
+The results are saved to a JSON file and can be compared with the results of an earlier run (e.g. another commit):
+
+  python benchmark_detector.py --output new.json --compare old.json
+
+SLW Oct-2026
+"""
+
+# Set files and paths ===================
+model_path = ""                        # empty: synthetic model
+synthetic_model_path = "synthetic_model"
+image_sizes = ["640x480", "1024x768", "1920x1080"]
+batch_sizes = [1, 4, 8]
+warmup_runs = 5
+timed_runs = 50
+output_file = "benchmark_detector.json"
+# =======================================
+
+import os
+import sys
+import time
+import argparse
+import platform
+import numpy as np
+import detector
+import renderer
+import benchmark_report
+
+
+def build_synthetic_model(model_dir, input_size=320, detections=10, classes=2):
+    """ Builds a small model with the outputs of a TF2 SSD model (scores, boxes, count, classes).
+        Requires tensorflow. """
+    import tensorflow as tf
+
+    class SyntheticSSD(tf.Module):
+        def __init__(self):
+            self.conv1 = tf.Variable(tf.random.normal([3, 3, 3, 16], stddev=0.1, seed=1))
+            self.conv2 = tf.Variable(tf.random.normal([3, 3, 16, 32], stddev=0.1, seed=2))
+            self.dense = tf.Variable(tf.random.normal([32, detections * 6], stddev=0.1, seed=3))
+
+        @tf.function(input_signature=[tf.TensorSpec([1, input_size, input_size, 3], tf.float32)])
+        def __call__(self, x):
+            y = tf.nn.relu(tf.nn.conv2d(x, self.conv1, 2, 'SAME'))
+            y = tf.nn.relu(tf.nn.conv2d(y, self.conv2, 2, 'SAME'))
+            y = tf.reduce_mean(y, axis=[1, 2])
+            z = tf.sigmoid(tf.reshape(tf.matmul(y, self.dense), [1, detections, 6]))
+            # The outputs depend on each other, which keeps their order in the tflite model
+            scores = tf.sort(z[:, :, 4], direction='DESCENDING')
+            boxes = tf.sort(z[:, :, :4], axis=2) + 0.0 * scores[:, :, None]
+            count = tf.reduce_sum(boxes[:, :, 0] * 0.0, axis=1) + detections
+            labels = tf.floor(z[:, :, 5] * classes) + 0.0 * count[:, None]
+            return count, scores, labels, boxes
+
+    model = SyntheticSSD()
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([model.__call__.get_concrete_function()], model)
+    os.makedirs(model_dir, exist_ok=True)
+    with open(os.path.join(model_dir, "detect.tflite"), "wb") as f:
+        f.write(converter.convert())
+    with open(os.path.join(model_dir, "labelmap.txt"), "w") as f:
+        f.write("???\n" + "\n".join("class_" + str(i) for i in range(classes)) + "\n")
+
+
+def peak_rss_mb():
+    """ Peak resident memory of the process in MB (None if not available) """
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _stats(times, frames=1):
+    ms = np.array(times) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'p50_ms': round(float(p50), 4), 'p95_ms': round(float(p95), 4), 'p99_ms': round(float(p99), 4),
+            'mean_ms': round(float(ms.mean()), 4), 'fps': round(frames * 1000 / float(ms.mean()), 2)}
+
+
+def _time(function, warmup_runs, timed_runs):
+    for _ in range(warmup_runs):
+        function()
+    times = []
+    for _ in range(timed_runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run(dtc, image_sizes, batch_sizes, warmup_runs=5, timed_runs=50, verbose=True):
+    """ Runs all benchmarks. Returns a list of result dictionaries. """
+    results = []
+    rng = np.random.default_rng(0)
+    rnd = renderer.Renderer(dtc.labels)
+
+    def add(size, batch, stage, times, frames=1):
+        result = {'size': size, 'batch': batch, 'stage': stage}
+        result.update(_stats(times, frames))
+        results.append(result)
+        if verbose:
+            print("{:10s} {:5d}  {:14s} {:9.3f} {:9.3f} {:9.3f} {:9.1f}".format(
+                size, batch, stage, result['p50_ms'], result['p95_ms'], result['p99_ms'], result['fps']))
+
+    if verbose:
+        print("Size       Batch  Stage             p50 ms    p95 ms    p99 ms       fps")
+    for size in image_sizes:
+        width, height = [int(v) for v in size.split('x')]
+        frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        input_data = dtc.preprocess(frame)
+        add(size, 1, "preprocess", _time(lambda: dtc.preprocess(frame), warmup_runs, timed_runs))
+        add(size, 1, "invoke", _time(lambda: dtc.invoke(input_data), warmup_runs, timed_runs))
+        add(size, 1, "outputs", _time(dtc.get_outputs, warmup_runs, timed_runs))
+        boxes, classes, scores = dtc.get_outputs()
+        texts = [dtc.labels[c] + ": " + str(round(s * 100)) + '%' for c, s in zip(classes, scores)]
+
+        def add_boxes():
+            img = frame.copy()
+            for i in range(len(boxes)):
+                dtc.add_box(img, boxes[i], texts[i])
+
+        def render():
+            rnd.draw_detections(frame.copy(), boxes, classes, scores, threshold=0.0)
+
+        add(size, 1, "add_box", _time(add_boxes, warmup_runs, timed_runs))
+        add(size, 1, "renderer", _time(render, warmup_runs, timed_runs))
+        for batch in batch_sizes:
+            frames = [frame] * batch
+            add(size, batch, "detect_batch", _time(lambda: dtc.detect_objects_batch(frames),
+                                                   warmup_runs, timed_runs), batch)
+    return results
+
+
+#====================================================================================
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Micro-benchmark for the class Detector")
+    parser.add_argument("--model", default=model_path, help="model folder (default: synthetic model)")
+    parser.add_argument("--sizes", default=",".join(image_sizes), help="image sizes, e.g. 640x480,1920x1080")
+    parser.add_argument("--batches", default=",".join(str(b) for b in batch_sizes), help="batch sizes, e.g. 1,4,8")
+    parser.add_argument("--warmup", type=int, default=warmup_runs)
+    parser.add_argument("--runs", type=int, default=timed_runs)
+    parser.add_argument("--output", default=output_file, help="JSON file for the results")
+    parser.add_argument("--compare", default="", help="JSON file of an earlier run")
+    args = parser.parse_args()
+
+    print("Detector benchmark")
+    print(40 * "=")
+    model = args.model
+    if len(model) == 0:
+        model = synthetic_model_path
+        if not os.path.isfile(os.path.join(model, "detect.tflite")):
+            print("Building synthetic model in '" + model + "' ...")
+            build_synthetic_model(model)
+    dtc = detector.Detector(model)
+    boxes, classes, scores = dtc.detect_objects(np.zeros((480, 640, 3), dtype=np.uint8))
+    if boxes.ndim != 2 or boxes.shape[1] != 4 or len(classes) != len(boxes) or len(scores) != len(boxes):
+        print("Error: unexpected outputs of the model (boxes", boxes.shape, "/ classes", len(classes),
+              "/ scores", len(scores), ")!")
+        sys.exit(1)
+
+    results = run(dtc, args.sizes.split(','), [int(b) for b in args.batches.split(',')], args.warmup, args.runs)
+    meta = {'model': model, 'backend': dtc.backend, 'num_threads': dtc.num_threads, 'xnnpack': dtc.xnnpack,
+            'machine': platform.node(), 'cpu_count': os.cpu_count(), 'python': platform.python_version(),
+            'peak_rss_mb': peak_rss_mb()}
+    print()
+    print("Peak RSS:", meta['peak_rss_mb'], "MB")
+    report = benchmark_report.save_report(args.output, meta, results)
+    print("Results saved to", args.output)
+    if len(args.compare) > 0:
+        benchmark_report.compare(args.compare, report, ['size', 'batch', 'stage'], ['p50_ms'])
+    print("Done!")
@@ -0,0 +1,224 @@
+""" benchmark_evaluation.py
+
+Benchmark for the evaluation pipeline without a model and without image files:
+  - a synthetic Pascal VOC dataset is generated (number of images, objects per image, number of classes)
+  - a stub detector returns deterministic estimated objects (shifted copies of the true boxes plus random boxes)
+  - the steps are timed separately:
+      decode_xml    Evaluator._decode_xml() per image
+      annotation    annotation.read_annotation() per image (for reference)
+      match         Evaluator.match_objects() per image
+      match_arrays  Evaluator.match_arrays() per image (structured arrays, vectorized)
+      aggregate     result dataframes plus summary.summarize() for all images
+for 1 to 1000 objects per image. For each step, the growth from one object count to the next is shown as an exponent:
+about 1 is linear, about 2 is quadratic. Steps with an exponent above 'max_exponent' are flagged.
+The results are saved to a JSON file and can be compared with the results of an earlier run:
+
+  python benchmark_evaluation.py --output new.json --compare old.json
+
+SLW Oct-2026
+"""
+
+# Set files and paths ===================
+dataset_dir = "synthetic_voc"
+image_count = 20
+objects_per_image = [1, 10, 100, 1000]
+class_count = 5
+image_width, image_height = 1280, 960
+timed_runs = 3
+max_exponent = 1.5
+output_file = "benchmark_evaluation.json"
+# =======================================
+
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import evaluator
+import annotation
+import summary
+import benchmark_report
+
+
+def class_names(class_count):
+    return ["class_" + str(i) for i in range(class_count)]
+
+
+def generate_dataset(path, image_count, objects, class_count, width=1280, height=960, seed=0):
+    """ Writes 'image_count' XML files with 'objects' random boxes each. Returns the names (without file type). """
+    os.makedirs(path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    labels = class_names(class_count)
+    names = []
+    for i in range(image_count):
+        name = "synthetic_" + str(i).zfill(5)
+        size = rng.integers(10, max(11, min(width, height) // 4), (objects, 2))
+        xmin = rng.integers(0, width - size[:, 0])
+        ymin = rng.integers(0, height - size[:, 1])
+        boxes = zip(xmin, ymin, xmin + size[:, 0], ymin + size[:, 1])
+        classes = [labels[c] for c in rng.integers(0, class_count, objects)]
+        annotation.write_annotation(os.path.join(path, name + ".xml"), name + ".jpg", width, height, classes, boxes)
+        names.append(name)
+    return names
+
+
+class StubDetector:
+    """ Detector without a model. It returns 'max_objects' estimated objects:
+        shifted copies of the first true objects (set by set_truth()) and random boxes, scores in descending order.
+        The result depends only on the true objects and the seed. """
+
+    def __init__(self, labels, max_objects=10, seed=0):
+        self._labels = list(labels)
+        self._max_objects = max_objects
+        self._seed = seed
+        self._true_classes, self._true_boxes = [], []
+        self.interpreter_width, self.interpreter_height = 320, 320
+
+    def set_truth(self, true_classes, true_boxes):
+        self._true_classes, self._true_boxes = true_classes, true_boxes
+
+    def detect_objects(self, frame):
+        rng = np.random.default_rng([self._seed, len(self._true_boxes)])
+        boxes = rng.uniform(0.0, 0.5, (self._max_objects, 4))
+        boxes[:, 2:] += boxes[:, :2]
+        classes = [int(c) for c in rng.integers(0, len(self._labels), self._max_objects)]
+        n = min(len(self._true_boxes), self._max_objects * 3 // 4)
+        if n > 0:
+            boxes[:n] = np.clip(np.array(self._true_boxes[:n]) + rng.normal(0.0, 0.01, (n, 4)), 0.0, 1.0)
+            for i in range(n):
+                if rng.random() < 0.9 and self._true_classes[i] in self._labels:
+                    classes[i] = self._labels.index(self._true_classes[i])
+        scores = np.sort(rng.uniform(0.3, 1.0, self._max_objects))[::-1]
+        return boxes, classes, scores
+
+    def detect_objects_batch(self, frames):
+        return [self.detect_objects(frame) for frame in frames]
+
+    @property
+    def labels(self):
+        return self._labels
+
+
+def _time(function, runs):
+    """ Returns the median time of a function in s """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def run(path, image_count, objects_per_image, class_count, width=1280, height=960, runs=3, verbose=True):
+    """ Runs all steps for each number of objects per image. Returns a list of result dictionaries (times in ms). """
+    stub = StubDetector(class_names(class_count))
+    evl = evaluator.Evaluator("", dtc=stub)
+    results = []
+    if verbose:
+        print("Objects   decode_xml   annotation        match match_arrays    aggregate   (ms per image)")
+    for objects in objects_per_image:
+        data_path = os.path.join(path, "objects_" + str(objects))
+        names = generate_dataset(data_path, image_count, objects, class_count, width, height)
+        decoded = [evl._decode_xml(name + ".xml", data_path) for name in names]
+        estimated = []
+        for _, true_classes, true_boxes in decoded:
+            stub.set_truth(true_classes, true_boxes)
+            estimated.append(stub.detect_objects(None))
+
+        def decode_xml():
+            for name in names:
+                evl._decode_xml(name + ".xml", data_path)
+
+        def read_annotation():
+            for name in names:
+                annotation.read_annotation(os.path.join(data_path, name + ".xml"))
+
+        def match():
+            for (_, true_classes, true_boxes), (est_boxes, est_classes, est_scores) in zip(decoded, estimated):
+                evl.match_objects(true_classes, true_boxes, est_boxes, est_classes, est_scores)
+
+        def match_arrays():
+            for image_id, ((_, true_classes, true_boxes), (est_boxes, est_classes, est_scores)) in \
+                    enumerate(zip(decoded, estimated)):
+                evl.match_arrays(true_classes, true_boxes, est_boxes, est_classes, est_scores, image_id)
+
+        true_rows, est_rows = [], []
+        for name, (_, true_classes, true_boxes), est in zip(names, decoded, estimated):
+            true_lst, est_lst, _ = evl.match_objects(true_classes, true_boxes, *est)
+            true_rows.extend([name] + true_obj for true_obj in true_lst)
+            est_rows.extend([name] + est_obj for est_obj in est_lst)
+
+        def aggregate():
+            summary.summarize(pd.DataFrame(true_rows, columns=summary.true_columns),
+                              pd.DataFrame(est_rows, columns=summary.est_columns))
+
+        result = {'objects': objects, 'images': image_count}
+        for step, function in (('decode_xml', decode_xml), ('annotation', read_annotation),
+                               ('match', match), ('match_arrays', match_arrays), ('aggregate', aggregate)):
+            result[step + '_ms'] = round(_time(function, runs) * 1000 / image_count, 4)
+        results.append(result)
+        if verbose:
+            print("{:7d} {:12.3f} {:12.3f} {:12.3f} {:12.3f} {:12.3f}".format(objects, result['decode_xml_ms'],
+                  result['annotation_ms'], result['match_ms'], result['match_arrays_ms'], result['aggregate_ms']))
+    return results
+
+
+steps = ['decode_xml', 'annotation', 'match', 'match_arrays', 'aggregate']
+
+
+def growth(results, max_exponent=1.5):
+    """ Prints the growth exponent of each step between consecutive object counts.
+        Returns the list of flagged (step, objects) """
+    flagged = []
+    print()
+    print("Growth exponent (1 = linear, 2 = quadratic)")
+    print("Objects        " + "".join("{:>13s}".format(s) for s in steps))
+    for r0, r1 in zip(results[:-1], results[1:]):
+        line = "{:5d}-{:<5d}    ".format(r0['objects'], r1['objects'])
+        for step in steps:
+            t0, t1 = r0[step + '_ms'], r1[step + '_ms']
+            if t0 <= 0 or t1 <= 0:
+                line += "{:>13s}".format("-")
+                continue
+            exponent = np.log(t1 / t0) / np.log(r1['objects'] / r0['objects'])
+            flag = " !" if exponent > max_exponent else "  "
+            if exponent > max_exponent:
+                flagged.append((step, r1['objects']))
+            line += "{:11.2f}{}".format(exponent, flag)
+        print(line)
+    if len(flagged) > 0:
+        print("Steps growing faster than linear (exponent > " + str(max_exponent) + ") are marked with '!'")
+    return flagged
+
+
+#====================================================================================
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark for the evaluation pipeline")
+    parser.add_argument("--images", type=int, default=image_count, help="number of images per dataset")
+    parser.add_argument("--objects", default=",".join(str(n) for n in objects_per_image),
+                        help="objects per image, e.g. 1,10,100,1000")
+    parser.add_argument("--classes", type=int, default=class_count)
+    parser.add_argument("--runs", type=int, default=timed_runs)
+    parser.add_argument("--dataset", default=dataset_dir, help="folder for the synthetic datasets")
+    parser.add_argument("--output", default=output_file, help="JSON file for the results")
+    parser.add_argument("--compare", default="", help="JSON file of an earlier run")
+    args = parser.parse_args()
+
+    print("Evaluation benchmark")
+    print(40 * "=")
+    print(args.images, "images per dataset,", args.classes, "classes")
+    print()
+    objects = sorted(int(n) for n in args.objects.split(','))
+    results = run(args.dataset, args.images, objects, args.classes, image_width, image_height, args.runs)
+    flagged = growth(results, max_exponent)
+    report = benchmark_report.save_report(args.output, {'images': args.images, 'classes': args.classes,
+                                                       'runs': args.runs, 'flagged': [list(f) for f in flagged]},
+                                          results)
+    print()
+    print("Results saved to", args.output)
+    if len(args.compare) > 0:
+        # times per image
+        benchmark_report.compare(args.compare, report, ['objects'], [step + '_ms' for step in steps])
+    print("Done!")
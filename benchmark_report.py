@@ -0,0 +1,63 @@
+""" benchmark_report.py
+
+Helper functions for the JSON reports of the benchmarks ('benchmark_detector.py', 'benchmark_evaluation.py'):
+  - git_commit() - the short hash of the current git commit (empty if git is not available)
+  - save_report() - saves the settings and results of a run, with the git commit and the time
+  - compare() - prints the changes between an earlier report and the current run
+
+A report is a dict {'meta': {...}, 'results': [{...}, ...]}. The results of two runs are matched by key fields
+(e.g. 'objects', or 'size', 'batch' and 'stage'), and the values (times in ms) are compared.
+
+SLW Oct-2026
+"""
+
+import os
+import json
+import time
+import subprocess
+
+
+def git_commit():
+    """ Returns the short hash of the current git commit of the scripts, or "" """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def save_report(file_name, meta, results):
+    """ Saves the results of a run to a JSON file, the commit and the time are added to meta.
+        Returns the report. """
+    report = {'meta': dict({'commit': git_commit(), 'time': time.strftime("%Y-%m-%d %H:%M:%S")}, **meta),
+              'results': results}
+    with open(file_name, "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def compare(old_file, new, keys, values):
+    """ Prints the change of the values between an earlier report (JSON file) and the current report.
+        The results are matched by the fields 'keys', the fields 'values' are compared. """
+    try:
+        with open(old_file, "r") as f:
+            old = json.load(f)
+    except (OSError, ValueError) as e:
+        print("Error: can't read '" + old_file + "' (" + str(e) + ")!")
+        return
+    old_results = {tuple(r.get(k) for k in keys): r for r in old.get('results', [])}
+    print()
+    print("Comparison with '" + old_file + "' (" + old.get('meta', {}).get('commit', '') + ")")
+    print("".join("{:12s} ".format(k.capitalize()) for k in keys) + "{:14s} {:>9s}  {:>9s}  {:>8s}".format(
+          "Value", "old ms", "new ms", "change"))
+    for r in new['results']:
+        o = old_results.get(tuple(r[k] for k in keys))
+        if o is None:
+            continue
+        for value in values:
+            if value not in o:
+                continue
+            t0, t1 = o[value], r[value]
+            change = (t1 - t0) * 100 / t0 if t0 > 0 else 0.0
+            print("".join("{:12s} ".format(str(r[k])) for k in keys) +
+                  "{:14s} {:9.3f}  {:9.3f}  {:+7.1f}%".format(value.replace('_ms', ''), t0, t1, change))
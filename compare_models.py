@@ -0,0 +1,132 @@
+""" compare_models.py
+
+This script compares several trained models (e.g. two checkpoints, or an int8 and a float32 export)
+on the same image lists. Each image and its XML file are read only once,
+then the image is passed to all models, which run concurrently (one thread per model).
+
+Output:
+  - side-by-side summary tables per image list (all classes and by class, one row per model)
+  - latency per model: percentiles p50, p95 and p99 of the detector time per image in ms
+    (with concurrent_models, the models share the CPU, so the times include the contention between them;
+    set concurrent_models = False to measure each model on its own)
+
+SLW Oct-2026
+"""
+
+# Set files and paths ===================
+project_dir = "micro-organisms"
+image_dir = "images"
+image_file_lists = ["test_images.txt"]
+model_dirs = ["model", "model_int8"]
+concurrent_models = True
+# =======================================
+
+import os
+import time
+import concurrent.futures
+import numpy as np
+import pandas as pd
+import evaluator
+import summary
+
+
+def read_image_list(file_name):
+    """ Returns the names of the XML files in an image list (without folder and file type) """
+    names = []
+    with open(file_name, "r") as files:
+        for image_file in files.readlines():
+            image_file = image_file.strip('\n')
+            image_file = image_file[image_file.rfind('/') + 1 :]
+            pos = image_file.rfind('.')
+            if pos < 0:
+                print("Error: can't identify file type on '" + image_file + "'. File skipped.")
+                continue
+            if image_file[pos+1 :].casefold() == "xml":
+                names.append(image_file[: pos])
+    return names
+
+
+def _run_model(evl, img, true_classes, true_boxes):
+    """ Runs one model on an image. Returns the results and the detector time in s. """
+    start = time.perf_counter()
+    est_boxes, est_classes, est_scores = evl.detector.detect_objects(img)
+    duration = time.perf_counter() - start
+    true_lst, est_lst, _ = evl.match_objects(true_classes, true_boxes, est_boxes, est_classes, est_scores)
+    return true_lst, est_lst, duration
+
+
+def compare(evaluators, image_path, names, concurrent_models=True):
+    """ Evaluates all images with all models.
+        Returns a dictionary: model -> (true results, estimated results, list of detector times) """
+    rows = {model: ([], [], []) for model in evaluators}
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(evaluators)) if concurrent_models else None
+    for name in names:
+        print("- " + name + 20 * ' ', end='\r')
+        img, true_classes, true_boxes = next(iter(evaluators.values())).read_image(name, image_path)
+        if img is None:
+            continue
+        if executor is not None:
+            futures = {model: executor.submit(_run_model, evl, img, true_classes, true_boxes)
+                       for model, evl in evaluators.items()}
+            results = {model: future.result() for model, future in futures.items()}
+        else:
+            results = {model: _run_model(evl, img, true_classes, true_boxes) for model, evl in evaluators.items()}
+        for model, (true_lst, est_lst, duration) in results.items():
+            rows[model][0].extend([name] + true_obj for true_obj in true_lst)
+            rows[model][1].extend([name] + est_obj for est_obj in est_lst)
+            rows[model][2].append(duration)
+    if executor is not None:
+        executor.shutdown()
+    print("Done!" + 20 * ' ')
+    return {model: (pd.DataFrame(t, columns=summary.true_columns), pd.DataFrame(e, columns=summary.est_columns), d)
+            for model, (t, e, d) in rows.items()}
+
+
+def print_latency(results, concurrent_models=False):
+    """ Prints the detector time percentiles per model """
+    model_len = max(20, max(len(m) for m in results) + 1)
+    print("Latency " + 60 * '-')
+    print("Model".ljust(model_len) + " Images    p50 ms    p95 ms    p99 ms   mean ms")
+    for model, (_, _, durations) in results.items():
+        if len(durations) == 0:
+            print(model.ljust(model_len) + "      0         -         -         -         -")
+            continue
+        ms = np.array(durations) * 1000
+        p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+        print(model.ljust(model_len) + "{:7d}  {:8.2f}  {:8.2f}  {:8.2f}  {:8.2f}".format(
+            len(ms), p50, p95, p99, ms.mean()))
+    if concurrent_models:
+        print("Note: measured while all models ran at the same time, the times include the contention between the models.")
+        print("Set concurrent_models = False for the latency of each model on its own.")
+    print()
+
+
+#====================================================================================
+
+if __name__ == "__main__":
+
+    print("Compare models")
+    print(40 * "=")
+    print()
+
+    image_path = os.path.join(project_dir, image_dir)
+    evaluators = {}
+    for model_dir in model_dirs:
+        print("Loading model '" + model_dir + "' ...")
+        evaluators[model_dir] = evaluator.Evaluator(os.path.join(project_dir, model_dir))
+
+    for file_list in image_file_lists:
+        names = read_image_list(os.path.join(project_dir, file_list))
+        if len(names) == 0:
+            print("File list is empty. Nothing to do!")
+            print()
+            continue
+        print()
+        print("Evaluating " + str(len(names)) + " images of '" + file_list + "' ...")
+        results = compare(evaluators, image_path, names, concurrent_models)
+        summary.print_comparison({model: (t, e) for model, (t, e, _) in results.items()}, file_list)
+        print_latency(results, concurrent_models)
+
+    for evl in evaluators.values():
+        evl.cleanup()
+    print("Done!")
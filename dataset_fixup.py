@@ -0,0 +1,316 @@
+""" dataset_fixup.py
+
+Renames the files of an image folder and corrects the XML files in one step, with a journal for undo.
+
+The folder is listed once (os.scandir) and all changes are planned before any file is touched:
+  - blanks in file names are replaced by '_'
+  - a prefix is added to the names (usually the name of the class of the images), if not already there
+  - the extensions are normalized (e.g. '.JPG' and '.jpeg' -> '.jpg', '.XML' -> '.xml')
+  - the tag <filename> of each XML file is set to the (new) name of its image
+An image and its XML file (same name, different extension) are renamed together: if one of the new names
+already exists, neither file is renamed and the conflict is reported.
+Hidden files (e.g. the journal) are not changed.
+
+Before the changes are applied, the plan is written to a journal (.fixup_journal.jsonl in the folder),
+with the old and new names and, for the XML files, the old and new content of the tag <filename>.
+The renames and the XML files are then processed in a pool of threads, the XML files are written
+in one step (temporary file plus rename). If the run is interrupted, or the result is not as expected,
+undo() (python dataset_fixup.py --undo) restores the original names and XML files.
+A new run is refused as long as the journal of an interrupted run exists.
+
+Used by 'prefix_files.py' and 'check_images.py'.
+
+SLW Oct-2026
+"""
+
+# Set files and paths ===================
+project_dir = "."
+image_dir = "images"
+prefix = None               # e.g. "paramecium", None: no prefix
+replace_blanks = True
+normalize_extensions = True
+fix_xml = True
+workers = 8
+# =======================================
+
+import os
+import sys
+import json
+import time
+import argparse
+import concurrent.futures
+
+journal_name = ".fixup_journal.jsonl"
+extension_map = {".jpg": ".jpg", ".jpeg": ".jpg", ".png": ".png", ".xml": ".xml"}
+image_extensions = (".jpg", ".png")
+
+
+class FixupPlan:
+    """ The planned changes of a folder """
+
+    def __init__(self):
+        self.renames = []       # list of (old name, new name)
+        self.xml_fixes = []     # list of (xml file name before renaming, after renaming,
+                                #          old and new content of <filename>, new content of the file)
+        self.conflicts = []     # list of (old name, new name) not renamed, because the new name exists
+        self.errors = []        # list of (file name, message)
+        self.files = []         # all file names after the changes (sorted)
+        self.original = []      # all file names before the changes (sorted)
+        self.unchanged = 0      # number of files that are not renamed
+
+    def is_empty(self):
+        return len(self.renames) == 0 and len(self.xml_fixes) == 0
+
+
+def _new_stem(stem, prefix=None, replace_blanks=True):
+    if replace_blanks:
+        stem = stem.replace(' ', '_')
+    if prefix is not None and not stem.startswith(prefix + '_'):
+        stem = prefix + '_' + stem
+    return stem
+
+
+def _split(name):
+    """ Returns stem and extension (including '.') of a file name """
+    pos = name.rfind('.')
+    if pos <= 0:
+        return name, ""
+    return name[:pos], name[pos:]
+
+
+def _read_xml(file_name):
+    """ Returns the content of an XML file and the position (start, end) of the file name in the tag <filename> """
+    with open(file_name, "r") as f:
+        s = f.read()
+    start_pos = s.find("<filename>")
+    if start_pos < 0:
+        return s, None
+    start_pos += 10
+    end_pos = s.find("</filename>", start_pos)
+    if end_pos < 0:
+        return s, None
+    return s, (start_pos, end_pos)
+
+
+def plan(path, prefix=None, replace_blanks=True, normalize_extensions=True, fix_xml=True, workers=8):
+    """ Lists the folder once and returns the planned changes (FixupPlan). No file is changed. """
+    result = FixupPlan()
+    groups = {}
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            stem, ext = _split(entry.name)
+            groups.setdefault(stem, []).append(ext)
+    existing = set()
+    for stem, exts in groups.items():
+        existing.update(stem + ext for ext in exts)
+
+    # Renames, by group of files with the same stem
+    targets = set()
+    final = {}                  # old name -> new name of all files
+    for stem in sorted(groups):
+        new_stem = _new_stem(stem, prefix, replace_blanks)
+        pairs = []
+        for ext in sorted(groups[stem]):
+            new_ext = extension_map.get(ext.casefold(), ext) if normalize_extensions else ext
+            pairs.append((stem + ext, new_stem + new_ext))
+        conflict = False
+        for old, new in pairs:
+            if new != old and (new in existing or new in targets):
+                conflict = True
+        if len({new for _, new in pairs}) < len(pairs):
+            # e.g. 'a.jpg' and 'a.JPG'
+            conflict = True
+        for old, new in pairs:
+            if new == old:
+                result.unchanged += 1
+                final[old] = old
+            elif conflict:
+                result.conflicts.append((old, new))
+                result.unchanged += 1
+                final[old] = old
+            else:
+                result.renames.append((old, new))
+                targets.add(new)
+                final[old] = new
+    result.files = sorted(final.values())
+    result.original = sorted(final)
+
+    # File names in the XML files
+    if fix_xml:
+        xml_files = []
+        for stem, exts in groups.items():
+            images = sorted(final[stem + ext] for ext in exts if final[stem + ext].casefold().endswith(image_extensions))
+            for ext in exts:
+                if ext.casefold() == ".xml" and len(images) > 0:
+                    xml_files.append((stem + ext, images[0]))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            contents = executor.map(lambda x: _read_xml(os.path.join(path, x[0])), xml_files)
+            for (xml_name, image_name), (s, span) in zip(xml_files, contents):
+                if span is None:
+                    result.errors.append((xml_name, "can't find tag '<filename>'"))
+                elif s[span[0]:span[1]] != image_name:
+                    new_s = s[:span[0]] + image_name + s[span[1]:]
+                    result.xml_fixes.append((xml_name, final[xml_name], s[span[0]:span[1]], image_name, new_s))
+        result.xml_fixes.sort()
+    return result
+
+
+def print_plan(plan, n=10):
+    """ Prints the number of changes and the first n changes of each type """
+    print(len(plan.renames), "files to rename,", len(plan.xml_fixes), "XML files to correct,",
+          plan.unchanged, "files unchanged")
+    for old, new in plan.renames[:n]:
+        print("- " + old + " -> " + new)
+    if len(plan.renames) > n:
+        print("- ...")
+    for _, name, _, _, _ in plan.xml_fixes[:n]:
+        print("- correcting <filename> in " + name)
+    if len(plan.xml_fixes) > n:
+        print("- ...")
+    if len(plan.conflicts) > 0:
+        print(len(plan.conflicts), "files not renamed, the new name exists:")
+        for old, new in plan.conflicts[:n]:
+            print("- " + old + " -> " + new)
+    for name, message in plan.errors[:n]:
+        print("Error in " + name + " - " + message + "!")
+
+
+def _read_journal(journal_file):
+    """ Returns the entries of a journal and whether the run was finished """
+    entries, finished = [], False
+    with open(journal_file, "r") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # e.g. a line cut by a crash while writing the journal, no file was changed yet
+                continue
+            if entry.get('op') == 'done':
+                finished = True
+            else:
+                entries.append(entry)
+    return entries, finished
+
+
+def _write_text(file_name, s):
+    """ Writes a text file in one step (temporary file plus rename) """
+    tmp_name = os.path.join(os.path.dirname(file_name), "." + os.path.basename(file_name) + ".tmp")
+    with open(tmp_name, "w") as f:
+        f.write(s)
+    os.replace(tmp_name, file_name)
+
+
+def apply(path, plan, workers=8):
+    """ Applies a plan with a journal. Returns the number of files renamed and XML files corrected,
+        or None if the journal of an interrupted run exists. """
+    journal_file = os.path.join(path, journal_name)
+    if os.path.isfile(journal_file) and not _read_journal(journal_file)[1]:
+        print("Error: the last run in '" + path + "' was interrupted! Please run undo first.")
+        return None
+    if plan.is_empty():
+        return 0, 0
+
+    # The journal is complete on the disk before the first change
+    with open(journal_file, "w") as f:
+        f.write(json.dumps({'op': 'begin', 'time': time.strftime("%Y-%m-%d %H:%M:%S")}) + "\n")
+        for old, new in plan.renames:
+            f.write(json.dumps({'op': 'rename', 'old': old, 'new': new}) + "\n")
+        for old_name, new_name, filename, new_filename, _ in plan.xml_fixes:
+            f.write(json.dumps({'op': 'xml', 'old': old_name, 'new': new_name,
+                                'filename': filename, 'new_filename': new_filename}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(lambda r: os.rename(os.path.join(path, r[0]), os.path.join(path, r[1])), plan.renames))
+        list(executor.map(lambda x: _write_text(os.path.join(path, x[1]), x[4]), plan.xml_fixes))
+
+    with open(journal_file, "a") as f:
+        f.write(json.dumps({'op': 'done'}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return len(plan.renames), len(plan.xml_fixes)
+
+
+def undo(path, workers=8):
+    """ Restores the names and XML files of the last run (finished or interrupted).
+        Returns the number of files renamed and XML files restored, or None if there is no journal. """
+    journal_file = os.path.join(path, journal_name)
+    if not os.path.isfile(journal_file):
+        print("Error: no journal found in '" + path + "' !")
+        return None
+    entries, _ = _read_journal(journal_file)
+
+    def restore_xml(entry):
+        # The file has the new name, if it was renamed before the interruption
+        for name in (entry['new'], entry['old']):
+            file_name = os.path.join(path, name)
+            if os.path.isfile(file_name):
+                s, span = _read_xml(file_name)
+                if span is not None and s[span[0]:span[1]] == entry['new_filename']:
+                    _write_text(file_name, s[:span[0]] + entry['filename'] + s[span[1]:])
+                    return 1
+                return 0
+        return 0
+
+    def rename_back(entry):
+        old_name, new_name = os.path.join(path, entry['old']), os.path.join(path, entry['new'])
+        if os.path.isfile(new_name) and not os.path.isfile(old_name):
+            os.rename(new_name, old_name)
+            return 1
+        return 0
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        xml_cnt = sum(executor.map(restore_xml, [e for e in entries if e.get('op') == 'xml']))
+        rename_cnt = sum(executor.map(rename_back, [e for e in entries if e.get('op') == 'rename']))
+    os.remove(journal_file)
+    return rename_cnt, xml_cnt
+
+
+#====================================================================================
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Renames the files of an image folder and corrects the XML files.")
+    parser.add_argument("--undo", action="store_true", help="restore the names and XML files of the last run")
+    parser.add_argument("--yes", action="store_true", help="apply the changes without asking")
+    args = parser.parse_args()
+
+    image_path = os.path.join(project_dir, image_dir)
+    if not os.path.isdir(image_path):
+        print("Error: can't find folder: '" + image_path + "' !")
+        sys.exit(1)
+
+    print("Dataset fix-up in '" + image_path + "'")
+    print(40 * "=")
+    print()
+
+    if args.undo:
+        result = undo(image_path, workers)
+        if result is None:
+            sys.exit(1)
+        print(result[0], "files renamed back,", result[1], "XML files restored.")
+        print("Done!")
+        sys.exit(0)
+
+    start = time.perf_counter()
+    fixup = plan(image_path, prefix, replace_blanks, normalize_extensions, fix_xml, workers)
+    print("Planned in {:.2f} s".format(time.perf_counter() - start))
+    print_plan(fixup)
+    if fixup.is_empty():
+        print("Nothing to do!")
+        sys.exit(0)
+    if not args.yes:
+        response = input("Proceed? (Y/N) ")
+        if response.strip()[:1] not in ('y', 'Y'):
+            print("Cancelled!")
+            sys.exit(0)
+    start = time.perf_counter()
+    result = apply(image_path, fixup, workers)
+    if result is None:
+        sys.exit(1)
+    print(result[0], "files renamed,", result[1], "XML files corrected in {:.2f} s".format(time.perf_counter() - start))
+    print("Undo with: python dataset_fixup.py --undo")
+    print("Done!")
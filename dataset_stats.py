@@ -0,0 +1,284 @@
+""" dataset_stats.py
+
+Statistics of the labeled objects of an image folder, e.g. to choose the input resolution of the model and the anchors.
+
+All objects of all XML files are read and counted in histograms with fixed bins, per class:
+  - width, height and area of the boxes in pixels
+  - aspect ratio (width / height)
+  - width, height and area relative to the image
+  - smaller side of the box at the input size of the detector (the image is resized to the input size,
+    see Detector.preprocess()), with the number of boxes below 'min_pixels'
+and the number of objects per image.
+The memory does not grow with the number of objects. The XML files are read in chunks by a pool of processes,
+each process fills its own histograms with vectorized NumPy operations, and the histograms are added at the end.
+Percentiles are read from the histograms (accuracy: the width of a bin, 9% for the pixel sizes).
+
+Class:
+- DatasetStats - histograms with add() and merge(), percentile(), count_below() and report()
+Functions:
+- read_objects() - reads XML files into arrays (labels, boxes, image sizes)
+- collect() - returns the statistics of a list of XML files
+
+SLW Oct-2026
+"""
+
+# Set files and paths ===================
+project_dir = "micro-organisms"
+image_dir = "images"
+input_size = (320, 320)     # width, height of the detector input (see "Interpreter resolution" of the detector)
+min_pixels = (8, 16, 32)    # report boxes with a smaller side below these sizes at the input size
+workers = None              # number of processes, None: number of cores
+# =======================================
+
+import os
+import re
+import sys
+import time
+import concurrent.futures
+import numpy as np
+
+# Bin edges of the histograms (values outside are counted in the first or last bin)
+pixel_bins = 2 ** np.arange(0, 13.01, 0.125)            # 1 ... 8192 pixel
+area_bins = 2 ** np.arange(0, 26.01, 0.25)              # 1 ... 64M pixel
+aspect_bins = 2 ** np.arange(-5, 5.01, 0.125)           # 1/32 ... 32
+relative_bins = np.linspace(0, 1, 101)
+relative_area_bins = 10 ** np.arange(-6, 0.01, 0.05)    # 1e-6 ... 1
+quantities = {'width': pixel_bins, 'height': pixel_bins, 'area': area_bins, 'aspect': aspect_bins,
+              'rel_width': relative_bins, 'rel_height': relative_bins, 'rel_area': relative_area_bins,
+              'input_side': pixel_bins}
+linear_quantities = ('rel_width', 'rel_height')     # the other quantities have log-spaced bins
+max_objects = 100           # objects per image: the last bin counts images with max_objects or more
+
+_size_re = re.compile(r"<width>([^<]*)</width>\s*<height>([^<]*)</height>")
+_object_re = re.compile(r"<name>([^<]*)</name>.*?<xmin>([^<]*)</xmin>\s*<ymin>([^<]*)</ymin>"
+                        r"\s*<xmax>([^<]*)</xmax>\s*<ymax>([^<]*)</ymax>", re.S)
+
+
+def read_objects(xml_files):
+    """ Reads XML files (Pascal VOC as written by labelImg).
+        Returns the labels (list), boxes (array n x 4: xmin, ymin, xmax, ymax), image sizes of the boxes
+        (array n x 2: width, height, 0 if not found), objects per file (array) and the number of files
+        that could not be read or have non-numeric values (these files are left out). """
+    labels, coords, sizes, counts = [], [], [], []
+    errors = 0
+    for xml_file in xml_files:
+        try:
+            with open(xml_file, "r") as f:
+                s = f.read()
+            size = _size_re.search(s)
+            size = (float(size.group(1)), float(size.group(2))) if size is not None else (0.0, 0.0)
+            objects = _object_re.findall(s)
+            file_coords = [float(v) for obj in objects for v in obj[1:]]
+        except (OSError, ValueError):
+            errors += 1
+            continue
+        labels += [obj[0] for obj in objects]
+        coords += file_coords
+        sizes.append(size)
+        counts.append(len(objects))
+    boxes = np.array(coords, dtype=np.float64).reshape(-1, 4)
+    counts = np.array(counts, dtype=np.int64)
+    image_sizes = np.repeat(np.array(sizes, dtype=np.float64).reshape(-1, 2), counts, axis=0)
+    return labels, boxes, image_sizes, counts, errors
+
+
+def _bin_index(edges, values):
+    return np.clip(np.searchsorted(edges, values, side='right') - 1, 0, len(edges) - 2)
+
+
+class DatasetStats:
+    def __init__(self, input_size=(320, 320), min_pixels=(8, 16, 32)):
+        self.input_size = tuple(input_size)
+        self.min_pixels = tuple(min_pixels)
+        self.labels = []
+        self._label_ids = {}
+        self.hist = {name: np.zeros((0, len(edges) - 1), dtype=np.int64) for name, edges in quantities.items()}
+        self.below = np.zeros((0, len(self.min_pixels)), dtype=np.int64)    # classes x min_pixels
+        self.objects_per_image = np.zeros(max_objects + 1, dtype=np.int64)
+        self.invalid = 0            # boxes with zero or negative width or height
+        self.size_missing = 0       # boxes without image size (not in the relative and input histograms)
+        self.read_errors = 0
+
+    def _class_ids(self, labels):
+        """ Returns the class ids of the labels, new labels are added """
+        for label in set(labels).difference(self._label_ids):
+            self._label_ids[label] = len(self.labels)
+            self.labels.append(label)
+        grow = len(self.labels) - len(self.below)
+        if grow > 0:
+            for name in self.hist:
+                self.hist[name] = np.vstack([self.hist[name], np.zeros((grow, self.hist[name].shape[1]), np.int64)])
+            self.below = np.vstack([self.below, np.zeros((grow, len(self.min_pixels)), np.int64)])
+        return np.array([self._label_ids[label] for label in labels], dtype=np.int64)
+
+    def _count(self, name, class_ids, values):
+        hist = self.hist[name]
+        idx = class_ids * hist.shape[1] + _bin_index(quantities[name], values)
+        hist += np.bincount(idx, minlength=hist.size).reshape(hist.shape)
+
+    def add(self, labels, boxes, image_sizes, objects_per_image=()):
+        """ Adds objects: labels (list), boxes (n x 4: xmin, ymin, xmax, ymax in pixels),
+            image sizes (n x 2: width, height of the image of each box) and the number of objects per image """
+        self.objects_per_image += np.bincount(np.minimum(np.asarray(objects_per_image, dtype=np.int64), max_objects),
+                                              minlength=max_objects + 1)
+        if len(labels) == 0:
+            return
+        class_ids = self._class_ids(labels)
+        width = boxes[:, 2] - boxes[:, 0]
+        height = boxes[:, 3] - boxes[:, 1]
+        valid = (width > 0) & (height > 0)
+        self.invalid += int(np.count_nonzero(~valid))
+        class_ids, width, height, image_sizes = class_ids[valid], width[valid], height[valid], image_sizes[valid]
+        self._count('width', class_ids, width)
+        self._count('height', class_ids, height)
+        self._count('area', class_ids, width * height)
+        self._count('aspect', class_ids, width / height)
+        known = (image_sizes[:, 0] > 0) & (image_sizes[:, 1] > 0)
+        self.size_missing += int(np.count_nonzero(~known))
+        class_ids, width, height, image_sizes = class_ids[known], width[known], height[known], image_sizes[known]
+        rel_width, rel_height = width / image_sizes[:, 0], height / image_sizes[:, 1]
+        self._count('rel_width', class_ids, rel_width)
+        self._count('rel_height', class_ids, rel_height)
+        self._count('rel_area', class_ids, rel_width * rel_height)
+        # The image is resized (not padded) to the input size
+        side = np.minimum(rel_width * self.input_size[0], rel_height * self.input_size[1])
+        self._count('input_side', class_ids, side)
+        for i, pixels in enumerate(self.min_pixels):
+            self.below[:, i] += np.bincount(class_ids[side < pixels], minlength=len(self.labels))
+
+    def merge(self, other):
+        """ Adds the histograms of another DatasetStats (e.g. of another process) """
+        class_ids = self._class_ids(other.labels)
+        for name in self.hist:
+            self.hist[name][class_ids] += other.hist[name]
+        self.below[class_ids] += other.below
+        self.objects_per_image += other.objects_per_image
+        self.invalid += other.invalid
+        self.size_missing += other.size_missing
+        self.read_errors += other.read_errors
+
+    def counts(self):
+        """ Returns a dictionary label -> number of objects """
+        totals = self.hist['width'].sum(axis=1)
+        return {label: int(totals[i]) for i, label in enumerate(self.labels)}
+
+    def percentile(self, name, q, label=None):
+        """ Returns the q-th percentile (0 - 100) of a quantity (see 'quantities') for all classes or one label,
+            as the center of the bin (geometric center for log-spaced bins). Returns NaN if there are no objects. """
+        hist = self.hist[name]
+        if label is not None and label not in self._label_ids:
+            return float('nan')
+        counts = hist.sum(axis=0) if label is None else hist[self._label_ids[label]]
+        total = counts.sum()
+        if total == 0:
+            return float('nan')
+        i = int(np.searchsorted(np.cumsum(counts), q / 100 * total))
+        i = min(i, len(counts) - 1)
+        edges = quantities[name]
+        if name in linear_quantities:
+            return float((edges[i] + edges[i + 1]) / 2)
+        return float(np.sqrt(edges[i] * edges[i + 1]))
+
+    def count_below(self, pixels, label=None):
+        """ Returns the number of boxes with a smaller side below 'pixels' (one of min_pixels) at the input size """
+        column = self.below[:, self.min_pixels.index(pixels)]
+        return int(column.sum() if label is None else column[self._label_ids[label]])
+
+    def report(self):
+        """ Prints the statistics """
+        counts = self.counts()
+        total = sum(counts.values())
+        images = int(self.objects_per_image.sum())
+        print(images, "images,", total, "objects,", len(self.labels), "classes")
+        if self.invalid > 0:
+            print("Boxes with zero width or height:", self.invalid)
+        if self.size_missing > 0:
+            print("Boxes without image size:", self.size_missing)
+        if self.read_errors > 0:
+            print("Files not read or with invalid values:", self.read_errors)
+        if total == 0:
+            return
+        print()
+        print("Objects per class:")
+        label_len = max(len(l) for l in self.labels) + 2
+        for label in sorted(self.labels, key=lambda l: -counts[l]):
+            print(("- {:" + str(label_len) + "s} {:9d} {:6.1f}%").format("'" + label + "'", counts[label],
+                                                                         100 * counts[label] / total))
+        print()
+        print("Percentiles (all classes)     5%       25%       50%       75%       95%")
+        for name in quantities:
+            values = [self.percentile(name, q) for q in (5, 25, 50, 75, 95)]
+            fmt = "{:10.4f}" if name.startswith('rel') else "{:10.2f}" if name == 'aspect' else "{:10.0f}"
+            print("- {:24s}".format(name) + "".join(fmt.format(v) for v in values))
+        print()
+        print("Median size per class (pixels): width x height, smaller side at input size " +
+              str(self.input_size[0]) + " x " + str(self.input_size[1]))
+        for label in self.labels:
+            print(("- {:" + str(label_len) + "s} {:6.0f} x {:6.0f}   {:6.1f}").format(
+                "'" + label + "'", self.percentile('width', 50, label), self.percentile('height', 50, label),
+                self.percentile('input_side', 50, label)))
+        print()
+        print("Boxes with a smaller side below N pixels at input size:")
+        for pixels in self.min_pixels:
+            cnt = self.count_below(pixels)
+            line = "- {:3d} pixels: {:9d} ({:5.1f}%)".format(pixels, cnt, 100 * cnt / total)
+            worst = max(self.labels, key=lambda l: self.count_below(pixels, l) / max(1, counts[l]))
+            if cnt > 0:
+                line += ", most affected: '" + worst + "' ({:.1f}%)".format(
+                    100 * self.count_below(pixels, worst) / max(1, counts[worst]))
+            print(line)
+        print()
+        print("Objects per image: mean {:.1f}, max {}{}".format(
+            float(np.dot(np.arange(max_objects + 1), self.objects_per_image)) / max(1, images),
+            int(np.flatnonzero(self.objects_per_image)[-1]) if images > 0 else 0,
+            "+" if self.objects_per_image[-1] > 0 else ""))
+        for n in np.flatnonzero(self.objects_per_image)[:15]:
+            print("- {:3d}{} objects: {:7d} images".format(int(n), "+" if n == max_objects else " ",
+                                                          int(self.objects_per_image[n])))
+
+
+def _collect_chunk(xml_files, input_size, min_pixels):
+    stats = DatasetStats(input_size, min_pixels)
+    labels, boxes, image_sizes, counts, errors = read_objects(xml_files)
+    stats.add(labels, boxes, image_sizes, counts)
+    stats.read_errors = errors
+    return stats
+
+
+def collect(xml_files, input_size=(320, 320), min_pixels=(8, 16, 32), workers=None, chunk_size=2000):
+    """ Returns the statistics (DatasetStats) of a list of XML files, read in chunks by a pool of processes """
+    stats = DatasetStats(input_size, min_pixels)
+    chunks = [xml_files[i : i + chunk_size] for i in range(0, len(xml_files), chunk_size)]
+    if len(chunks) <= 1:
+        for chunk in chunks:
+            stats.merge(_collect_chunk(chunk, input_size, min_pixels))
+        return stats
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_stats in executor.map(_collect_chunk, chunks, [input_size] * len(chunks), [min_pixels] * len(chunks)):
+            stats.merge(chunk_stats)
+    return stats
+
+
+#====================================================================================
+
+# The guard is needed for the worker processes
+if __name__ == "__main__":
+
+    image_path = os.path.join(project_dir, image_dir)
+    if not os.path.isdir(image_path):
+        print("Error: can't find folder: '" + image_path + "' !")
+        sys.exit(1)
+
+    print("Dataset statistics of '" + image_path + "'")
+    print(40 * "=")
+    print()
+
+    start = time.perf_counter()
+    with os.scandir(image_path) as it:
+        xml_files = sorted(os.path.join(image_path, e.name) for e in it if e.name.casefold().endswith(".xml"))
+    stats = collect(xml_files, input_size, min_pixels, workers)
+    duration = time.perf_counter() - start
+    stats.report()
+    print()
+    print("{} XML files read in {:.2f} s".format(len(xml_files), duration))
+    print("Done!")
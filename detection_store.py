@@ -0,0 +1,202 @@
+""" detection_store.py
+
+Class to store the detections of a video, so that it can be searched without another run of the detector,
+e.g. "frames where class X appears at least N times" or "first appearance of class Y".
+
+The detections are stored in columns (boxes, classes, scores) with run-length encoding:
+consecutive frames with unchanged detections (same classes, boxes and scores within a tolerance)
+are stored once as a run (first frame, end frame, detections). For each run, the number of objects per class
+is kept in a count matrix (runs x classes), which serves as index for the queries.
+So a query over hours of video is a vectorized operation on some thousand runs.
+
+The store is filled by 'analyze_videofile.py' (see 'record_file') and used by 'play_detections.py'.
+It is saved as a compressed NumPy file (*.npz).
+
+Methods:
+- add() - adds the detections of a frame
+- save() / load() - writes or reads the store
+- detections() - returns boxes, classes and scores of a frame
+- frames_with() - returns the frame ranges (start, end) where a class appears at least N times
+- first_appearance() - returns the first frame with a class
+- counts() - returns the number of objects per class for a frame
+
+SLW Oct-2026
+"""
+
+import numpy as np
+
+
+class DetectionStore:
+    def __init__(self, labels=(), threshold=0.3, box_tolerance=0.01, score_tolerance=0.05, fps=0.0, source=""):
+        """ - 'labels' are the labels of the detector
+            - detections below 'threshold' are not stored
+            - detections of consecutive frames are 'unchanged', if the boxes and scores differ
+              by not more than 'box_tolerance' and 'score_tolerance' """
+        self.labels = list(labels)
+        self.threshold = threshold
+        self.box_tolerance = box_tolerance
+        self.score_tolerance = score_tolerance
+        self.fps = fps
+        self.source = source
+        # Runs: first frame, end frame (exclusive), offset and count of the detections
+        self._run_start, self._run_end, self._run_offset, self._run_count = [], [], [], []
+        self._boxes, self._classes, self._scores = [], [], []
+        self._det_total = 0
+        self._last = None
+        self._arrays = None
+
+    def add(self, frame_no, boxes, classes, scores):
+        """ Adds the detections of a frame (as returned by Detector.detect_objects()). Frame numbers must increase. """
+        scores = np.asarray(scores, dtype=np.float32)
+        keep = scores >= self.threshold
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)[keep]
+        classes = np.asarray(classes, dtype=np.int16)[keep]
+        scores = scores[keep]
+        last = self._last
+        if (last is not None and self._run_end[-1] == frame_no and len(classes) == len(last[1])
+                and np.array_equal(classes, last[1])
+                and (len(classes) == 0 or (np.max(np.abs(boxes - last[0])) <= self.box_tolerance
+                                           and np.max(np.abs(scores - last[2])) <= self.score_tolerance))):
+            # Unchanged: extend the run
+            self._run_end[-1] = frame_no + 1
+            return
+        self._run_start.append(frame_no)
+        self._run_end.append(frame_no + 1)
+        self._run_offset.append(self._det_total)
+        self._run_count.append(len(classes))
+        self._det_total += len(classes)
+        self._boxes.append(boxes)
+        self._classes.append(classes)
+        self._scores.append(scores)
+        self._last = (boxes, classes, scores)
+        self._arrays = None
+
+    def _build(self):
+        """ Builds the arrays of the store (after add()) """
+        if self._arrays is None:
+            run_start = np.array(self._run_start, dtype=np.int64)
+            classes = np.concatenate(self._classes) if len(self._classes) > 0 else np.zeros(0, np.int16)
+            run_count = np.array(self._run_count, dtype=np.int64)
+            counts = np.zeros((len(run_start), max(1, len(self.labels))), dtype=np.uint16)
+            if len(classes) > 0:
+                run_of = np.repeat(np.arange(len(run_start)), run_count)
+                valid = (classes >= 0) & (classes < counts.shape[1])
+                np.add.at(counts, (run_of[valid], classes[valid]), 1)
+            self._arrays = {
+                'run_start': run_start,
+                'run_end': np.array(self._run_end, dtype=np.int64),
+                'run_offset': np.array(self._run_offset, dtype=np.int64),
+                'run_count': run_count,
+                'boxes': np.concatenate(self._boxes).astype(np.float16) if len(self._boxes) > 0 else np.zeros((0, 4), np.float16),
+                'classes': classes,
+                'scores': np.concatenate(self._scores).astype(np.float16) if len(self._scores) > 0 else np.zeros(0, np.float16),
+                'counts': counts}
+        return self._arrays
+
+    def save(self, file_name):
+        """ Writes the store to a compressed NumPy file """
+        arrays = self._build()
+        np.savez_compressed(file_name, labels=np.array(self.labels, dtype=str),
+                            settings=np.array([self.threshold, self.box_tolerance, self.score_tolerance, self.fps]),
+                            source=np.array(self.source), **arrays)
+
+    @classmethod
+    def load(cls, file_name):
+        """ Reads a store written by save(). The store can be queried, but not extended. """
+        with np.load(file_name) as data:
+            threshold, box_tolerance, score_tolerance, fps = data['settings']
+            store = cls([str(l) for l in data['labels']], threshold, box_tolerance, score_tolerance, fps, str(data['source']))
+            store._arrays = {key: data[key] for key in ('run_start', 'run_end', 'run_offset', 'run_count',
+                                                         'boxes', 'classes', 'scores', 'counts')}
+        return store
+
+    def _run(self, frame_no):
+        """ Returns the index of the run of a frame, or -1 """
+        arrays = self._build()
+        idx = np.searchsorted(arrays['run_start'], frame_no, side='right') - 1
+        if idx < 0 or frame_no >= arrays['run_end'][idx]:
+            return -1
+        return int(idx)
+
+    def _label_id(self, label):
+        if isinstance(label, str):
+            return self.labels.index(label) if label in self.labels else -1
+        return int(label)
+
+    def detections(self, frame_no):
+        """ Returns boxes, classes and scores of a frame (like Detector.detect_objects(), only the stored detections) """
+        idx = self._run(frame_no)
+        if idx < 0:
+            return np.zeros((0, 4), np.float32), [], np.zeros(0, np.float32)
+        arrays = self._arrays
+        start = arrays['run_offset'][idx]
+        end = start + arrays['run_count'][idx]
+        return (arrays['boxes'][start:end].astype(np.float32), [int(c) for c in arrays['classes'][start:end]],
+                arrays['scores'][start:end].astype(np.float32))
+
+    def counts(self, frame_no):
+        """ Returns a dictionary label -> number of objects for a frame """
+        idx = self._run(frame_no)
+        if idx < 0:
+            return {}
+        row = self._arrays['counts'][idx]
+        return {self.labels[c]: int(row[c]) for c in np.flatnonzero(row) if c < len(self.labels)}
+
+    def frames_with(self, label, min_count=1):
+        """ Returns an array of frame ranges (start, end exclusive) where 'label' (name or id)
+            appears at least 'min_count' times. Adjacent ranges are merged. """
+        arrays = self._build()
+        c = self._label_id(label)
+        if c < 0 or c >= arrays['counts'].shape[1]:
+            return np.zeros((0, 2), dtype=np.int64)
+        hits = np.flatnonzero(arrays['counts'][:, c] >= min_count)
+        if len(hits) == 0:
+            return np.zeros((0, 2), dtype=np.int64)
+        starts, ends = arrays['run_start'][hits], arrays['run_end'][hits]
+        # Merge ranges where a run ends at the start of the next run
+        new_range = np.ones(len(hits), dtype=bool)
+        new_range[1:] = starts[1:] != ends[:-1]
+        first = np.flatnonzero(new_range)
+        last = np.append(first[1:], len(hits)) - 1
+        return np.stack([starts[first], ends[last]], axis=1)
+
+    def first_appearance(self, label, min_count=1):
+        """ Returns the first frame where 'label' appears at least 'min_count' times, or -1 """
+        ranges = self.frames_with(label, min_count)
+        return int(ranges[0, 0]) if len(ranges) > 0 else -1
+
+    @property
+    def frame_count(self):
+        """ Number of frames up to the last frame with detections stored """
+        arrays = self._build()
+        return int(arrays['run_end'][-1]) if len(arrays['run_end']) > 0 else 0
+
+    @property
+    def run_count(self):
+        return len(self._build()['run_start'])
+
+
+#====================================================================================
+
+if __name__ == "__main__":
+
+    import time
+
+    # Demo: a synthetic recording of one hour at 30 frames per second
+    rng = np.random.default_rng(0)
+    store = DetectionStore(["paramecium", "euglena", "amoeba"], fps=30.0)
+    boxes, classes, scores = rng.uniform(0, 1, (10, 4)), [0] * 10, np.full(10, 0.2)
+    for frame_no in range(30 * 3600):
+        if frame_no % 50 == 0:
+            n = rng.integers(0, 6)
+            classes = list(rng.integers(0, 3, 10))
+            scores = np.sort(np.where(np.arange(10) < n, rng.uniform(0.5, 1.0, 10), 0.1))[::-1]
+        store.add(frame_no, boxes, classes, scores)
+    store.save("demo.detections.npz")
+    store = DetectionStore.load("demo.detections.npz")
+    print(store.frame_count, "frames stored in", store.run_count, "runs")
+    start = time.perf_counter()
+    ranges = store.frames_with("euglena", 3)
+    duration = time.perf_counter() - start
+    print(len(ranges), "ranges with at least 3 x euglena, query time {:.2f} ms".format(duration * 1000))
+    print("First amoeba in frame", store.first_appearance("amoeba"))
@@ -6,39 +6,137 @@ Based on Google tensorflow examples and tutorials with minor modifications.
 
 Methods:
 - detect_objects() - applies the detector to an image
-- add_box() - adds a rectangle including label to an image
+- detect_objects_batch() - applies the detector to a list of images
+- preprocess(), invoke(), get_outputs() - the steps of detect_objects() (see 'benchmark_detector.py')
+- add_box() - adds a rectangle including label to an image (see 'renderer.py' to add all boxes at once)
 
-Dependencies: OpenCV, tensorflow lite
+The interpreter is imported when the first Detector is built, so importing this module is fast.
+The lightest available backend is used: tflite_runtime (e.g. Raspberry Pi), ai_edge_litert or tensorflow.lite.
+The environment variable TFOD_INTERPRETER selects a backend ("tflite_runtime", "ai_edge_litert" or "tensorflow").
+
+If the model directory contains a tuning file "detect.tuning.json" (see 'tune_detector.py'), the number of threads
+and the use of the XNNPACK delegate are taken from it for the current machine.
+The steps preprocess, invoke and postprocess are timed if metrics are enabled (see 'metrics.py').
+
+Dependencies: OpenCV, tensorflow lite (one of the backends above)
 
 SLW 2023
 """
 
 import os
+import json
+import platform
+import importlib
 import cv2
 import numpy as np
+import renderer
+import metrics
+
+os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '0')
+
+# Interpreter backends, from the lightest to the full tensorflow package
+_backends = {"tflite_runtime": "tflite_runtime.interpreter",
+             "ai_edge_litert": "ai_edge_litert.interpreter",
+             "tensorflow": "tensorflow.lite"}
+_backend = None
+
+def load_backend():
+    """ Imports the interpreter backend on first use. Returns the name and the module of the backend. """
+    global _backend
+    if _backend is None:
+        name = os.environ.get("TFOD_INTERPRETER", "")
+        if len(name) > 0 and name not in _backends:
+            raise ValueError("TFOD_INTERPRETER: unknown backend '" + name + "', expected one of " + str(list(_backends)))
+        for name in ([name] if len(name) > 0 else list(_backends)):
+            try:
+                if name == "tensorflow":
+                    # The package tensorflow.lite lacks the API, it is an attribute of tensorflow
+                    module = importlib.import_module("tensorflow").lite
+                else:
+                    module = importlib.import_module(_backends[name])
+                _backend = (name, module)
+                break
+            except ImportError:
+                continue
+        else:
+            raise ImportError("No tflite interpreter found, please install tflite_runtime, ai_edge_litert or tensorflow")
+    return _backend
+
+
+def _op_resolver(module):
+    """ Returns OpResolverType of the backend, or None if XNNPACK can't be switched off """
+    # OpResolverType is in the module (tflite_runtime, ai_edge_litert) or in tensorflow.lite.experimental
+    resolver = getattr(module, 'OpResolverType', None)
+    if resolver is None and hasattr(module, 'experimental'):
+        resolver = getattr(module.experimental, 'OpResolverType', None)
+    return resolver
+
+
+def can_disable_xnnpack():
+    """ True if the backend can build an interpreter without the XNNPACK delegate """
+    return _op_resolver(load_backend()[1]) is not None
+
+
+def _make_interpreter(module, model_file, num_threads=None, xnnpack=True):
+    """ Builds the interpreter with the given number of threads, with or without the XNNPACK delegate.
+        Returns the interpreter and whether XNNPACK is used (True if it can't be switched off). """
+    kwargs = {}
+    if num_threads is not None:
+        kwargs['num_threads'] = num_threads
+    if not xnnpack:
+        resolver = _op_resolver(module)
+        if resolver is None:
+            xnnpack = True
+        else:
+            kwargs['experimental_op_resolver_type'] = resolver.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+    return module.Interpreter(model_file, **kwargs), xnnpack
+
+
+def load_tuning(model_dir):
+    """ Returns the tuned settings for this machine (dictionary) or an empty dictionary """
+    tuning_file = os.path.join(model_dir, "detect.tuning.json")
+    if not os.path.isfile(tuning_file):
+        return {}
+    with open(tuning_file, "r") as f:
+        return json.load(f).get(platform.node(), {})
 
-os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
 
-# Raspberry Pi
-# from tflite_runtime.interpreter import Interpreter
+def save_tuning(model_dir, settings):
+    """ Saves the tuned settings for this machine, settings of other machines are kept """
+    tuning_file = os.path.join(model_dir, "detect.tuning.json")
+    tuning = {}
+    if os.path.isfile(tuning_file):
+        with open(tuning_file, "r") as f:
+            tuning = json.load(f)
+    tuning[platform.node()] = settings
+    with open(tuning_file, "w") as f:
+        json.dump(tuning, f, indent=2)
 
-# Windows
-import tensorflow.lite
-Interpreter = tensorflow.lite.Interpreter
 
 class Detector:
-    def __init__(self, model_dir, verbose=True):
+    def __init__(self, model_dir, verbose=True, num_threads=None, xnnpack=None):
+        """ 'num_threads' and 'xnnpack' override the tuned settings (None: tuned setting or default) """
         # Operating values
         self.__labels = []
         self.__verbose = verbose
         self.model_dir = model_dir
-        self.interpreter = Interpreter(os.path.join(model_dir, "detect.tflite"))
+        self.backend, backend_module = load_backend()
+        tuning = load_tuning(model_dir)
+        self.num_threads = num_threads if num_threads is not None else tuning.get('num_threads')
+        requested = xnnpack if xnnpack is not None else tuning.get('xnnpack', True)
+        self.interpreter, self.xnnpack = _make_interpreter(backend_module, os.path.join(model_dir, "detect.tflite"),
+                                                           self.num_threads, requested)
+        if self.xnnpack != requested:
+            print("Warning: the backend '" + self.backend + "' can't switch off XNNPACK, it is used anyway.")
         self.interpreter.allocate_tensors()
         self.input_details = self.interpreter.get_input_details()
         self.interpreter_height = self.input_details[0]['shape'][1]
         self.interpreter_width = self.input_details[0]['shape'][2]
         self.model_type = self.input_details[0]['dtype']
         if verbose:
+            print("Interpreter backend:", self.backend)
+            if self.num_threads is not None or not self.xnnpack:
+                print("Interpreter threads:", self.num_threads, "/ XNNPACK:", self.xnnpack)
             print("Interpreter resolution:", self.interpreter_width, 'x', self.interpreter_height)
             print("Interpreter type:", self.model_type)
         self.output_details = self.interpreter.get_output_details()
@@ -72,18 +170,44 @@ class Detector:
                 classes (int)
                 probability scores (0.0 - 1.0)
         """
+        metrics.count("frames")
+        input_data = self.preprocess(frame)
+        self.invoke(input_data)
+        return self.get_outputs()
+
+
+    @metrics.timed("preprocess")
+    def preprocess(self, frame):
+        """ Converts a cv2 image frame into the input tensor """
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         frame_resized = cv2.resize(frame_rgb, (self.interpreter_width, self.interpreter_height))
         input_data = np.expand_dims(frame_resized, axis=0)
         if self.model_is_float:
             input_data = (np.float32(input_data) - self.input_mean) / self.input_std
+        return input_data
+
+
+    @metrics.timed("invoke")
+    def invoke(self, input_data):
+        """ Runs the interpreter on an input tensor """
         self.interpreter.set_tensor(self.input_details[0]['index'], input_data)
         self.interpreter.invoke()
+
+
+    @metrics.timed("postprocess")
+    def get_outputs(self):
+        """ Returns boxes, classes and scores of the last invoke() """
         boxes = self.interpreter.get_tensor(self.output_details[self.boxes_idx]['index'])[0]
         classes = self.interpreter.get_tensor(self.output_details[self.classes_idx]['index'])[0]
         classes = [int(c) for c in classes]
         scores = self.interpreter.get_tensor(self.output_details[self.scores_idx]['index'])[0]
         return boxes, classes, scores
+
+
+    def detect_objects_batch(self, frames):
+        """ Takes a list of cv2 image frames and returns a list of (boxes, classes, scores) tuples.
+            The interpreter has a fixed batch size of 1, so the frames are processed one after the other. """
+        return [self.detect_objects(frame) for frame in frames]
         
         
     def add_box(self, frame, box, label, color=(0, 255, 0), thickness=2):
@@ -132,12 +256,7 @@ if __name__ == "__main__":
     boxes, classes, scores = dtc.detect_objects(img)
     
     # Add boxes to image
-    for i in range(10):
-        if scores[i] > threshold:
-            img = dtc.add_box(img, boxes[i],
-                              dtc.labels[classes[i]] + ": " + str(round(scores[i]*100)) + '%')
-        else:
-            break
+    img = renderer.Renderer(dtc.labels).draw_detections(img, boxes, classes, scores, threshold)
     
     # Show the image and wait for a key
     cv2.imshow("", img)
@@ -0,0 +1,300 @@
+""" detector_server.py
+
+Local inference server for the tflite detector, so that several scripts and users can share one loaded model.
+The server keeps one warm Detector and answers requests via TCP ("host:port") or a Unix socket (path).
+Requests from all clients go into one bounded queue. The waiting requests are grouped into micro-batches
+(up to 'max_batch' frames) and passed to Detector.detect_objects_batch() in a worker thread. The server waits
+at most 'max_wait_ms' for more frames only if other frames are already waiting, so a single client is served
+without delay. If the queue is full, the server stops reading from the clients until there is room again (backpressure).
+A client may send several frames before it reads the results; the results are returned in the order of the requests.
+The interpreter has a batch size of 1 and runs the frames of a batch one after the other: the server saves
+the loading of the model for each script, it does not run faster than a Detector in one process.
+
+The class DetectorClient is a thin client with the same interface as the class Detector
+(detect_objects(), detect_objects_batch(), add_box(), labels), so it can be used as a drop-in replacement,
+e.g. Evaluator(model_path, dtc=DetectorClient("localhost:8555")).
+The client resizes the frames to the interpreter resolution before sending them. detect_objects_batch() sends
+the frames (up to 'max_in_flight' at a time) before it reads the results, so the next frame is waiting on the
+server while the current one is processed.
+
+Protocol: each message consists of the length of a JSON header (4 bytes), the length of the payload (4 bytes),
+the JSON header and the payload (raw image data for detection requests).
+
+SLW Oct-2026
+"""
+
+# Set files and paths ===================
+project_dir = "micro-organisms"
+model_dir = "model"
+server_address = "localhost:8555"   # "host:port" or path of a Unix socket
+max_batch = 8                       # max. number of frames per batch
+max_wait_ms = 5                     # max. waiting time for more frames
+max_queue = 64                      # max. number of frames waiting
+# =======================================
+
+import os
+import json
+import socket
+import struct
+import asyncio
+import threading
+import concurrent.futures
+import cv2
+import numpy as np
+import renderer
+
+# Protocol =========================================================================
+
+def _is_tcp(address):
+    return ':' in address and not address.startswith('/') and not os.path.isabs(address)
+
+
+def _pack(header, payload=b""):
+    header = json.dumps(header).encode()
+    return struct.pack(">II", len(header), len(payload)) + header + payload
+
+
+async def _read_message(reader):
+    lengths = await reader.readexactly(8)
+    header_len, payload_len = struct.unpack(">II", lengths)
+    header = json.loads(await reader.readexactly(header_len))
+    payload = await reader.readexactly(payload_len) if payload_len > 0 else b""
+    return header, payload
+
+
+def _recv_exactly(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if len(chunk) == 0:
+            raise ConnectionError("connection closed by the server")
+        buf += chunk
+    return bytes(buf)
+
+
+# Server ===========================================================================
+
+class InferenceServer:
+    def __init__(self, dtc, max_batch=8, max_wait_ms=5, max_queue=64, verbose=True):
+        self._dtc = dtc
+        self._max_batch = max_batch
+        self._max_wait = max_wait_ms / 1000
+        self._max_queue = max_queue
+        self._verbose = verbose
+        # The detector must not be used by two threads at the same time
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._queue = None
+        self.batch_cnt = 0
+        self.frame_cnt = 0
+
+
+    async def _batcher(self):
+        """ Collects requests into batches and runs the detector """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self._max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            # Waits for more frames only under load, a single client is not delayed
+            deadline = loop.time() + self._max_wait
+            while 1 < len(batch) < self._max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            frames = [frame for frame, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self._dtc.detect_objects_batch, frames)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batch_cnt += 1
+            self.frame_cnt += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+    async def _respond(self, writer, responses):
+        """ Writes the responses of a connection in the order of the requests """
+        while True:
+            response = await responses.get()
+            if response is None:
+                break
+            if isinstance(response, asyncio.Future):
+                try:
+                    boxes, classes, scores = await response
+                    response = {"boxes": np.asarray(boxes).tolist(),
+                                "classes": [int(c) for c in classes],
+                                "scores": np.asarray(scores).tolist()}
+                except Exception as e:
+                    response = {"error": str(e)}
+            writer.write(_pack(response))
+            await writer.drain()
+
+
+    async def _handle(self, reader, writer):
+        """ Serves one client connection. The next request is read while the frames before are processed. """
+        loop = asyncio.get_running_loop()
+        responses = asyncio.Queue()
+        responder = asyncio.create_task(self._respond(writer, responses))
+        try:
+            while not responder.done():
+                try:
+                    header, payload = await _read_message(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                if header.get("op") == "info":
+                    responses.put_nowait({"labels": self._dtc.labels,
+                                          "width": int(self._dtc.interpreter_width),
+                                          "height": int(self._dtc.interpreter_height)})
+                elif header.get("op") == "detect":
+                    frame = np.frombuffer(payload, dtype=np.uint8).reshape(header["shape"])
+                    future = loop.create_future()
+                    responses.put_nowait(future)
+                    # Waits if the queue is full
+                    await self._queue.put((frame, future))
+                else:
+                    responses.put_nowait({"error": "unknown operation"})
+            responses.put_nowait(None)
+            await responder
+        except ConnectionError:
+            responder.cancel()
+        finally:
+            writer.close()
+
+
+    async def serve(self, address):
+        """ Runs the server until it is cancelled """
+        self._queue = asyncio.Queue(self._max_queue)
+        if _is_tcp(address):
+            host, port = address.rsplit(':', 1)
+            server = await asyncio.start_server(self._handle, host, int(port))
+        else:
+            if os.path.exists(address):
+                os.remove(address)
+            server = await asyncio.start_unix_server(self._handle, address)
+        batcher = asyncio.create_task(self._batcher())
+        if self._verbose:
+            print("Detector server listening on", address)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self._executor.shutdown()
+
+
+# Client ===========================================================================
+
+class DetectorClient:
+    def __init__(self, address, verbose=True, max_in_flight=16):
+        if _is_tcp(address):
+            host, port = address.rsplit(':', 1)
+            self._sock = socket.create_connection((host, int(port)))
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(address)
+        self._lock = threading.Lock()
+        self._max_in_flight = max(1, max_in_flight)
+        self._rnd = None
+        info = self._request({"op": "info"})
+        self.__labels = info["labels"]
+        self.interpreter_width = info["width"]
+        self.interpreter_height = info["height"]
+        if verbose:
+            print("Connected to detector server", address)
+            print("Interpreter resolution:", self.interpreter_width, 'x', self.interpreter_height)
+            print(len(self.__labels), "labels found")
+            print()
+
+
+    def _receive(self):
+        header_len, payload_len = struct.unpack(">II", _recv_exactly(self._sock, 8))
+        response = json.loads(_recv_exactly(self._sock, header_len))
+        if payload_len > 0:
+            _recv_exactly(self._sock, payload_len)
+        return response
+
+
+    def _requests(self, messages):
+        """ Sends the messages (header, payload), up to max_in_flight at a time, and returns the responses """
+        responses = []
+        with self._lock:
+            for start in range(0, len(messages), self._max_in_flight):
+                chunk = messages[start : start + self._max_in_flight]
+                self._sock.sendall(b"".join(_pack(header, payload) for header, payload in chunk))
+                responses += [self._receive() for _ in chunk]
+        for response in responses:
+            if "error" in response:
+                raise RuntimeError("detector server: " + response["error"])
+        return responses
+
+
+    def _request(self, header, payload=b""):
+        return self._requests([(header, payload)])[0]
+
+
+    def _detect_message(self, frame):
+        frame = cv2.resize(frame, (self.interpreter_width, self.interpreter_height))
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        return {"op": "detect", "shape": list(frame.shape)}, frame.tobytes()
+
+
+    @staticmethod
+    def _detections(response):
+        return (np.array(response["boxes"], dtype=np.float32), response["classes"],
+                np.array(response["scores"], dtype=np.float32))
+
+
+    def detect_objects(self, frame):
+        """ Same as Detector.detect_objects(), but runs on the server """
+        return self._detections(self._request(*self._detect_message(frame)))
+
+
+    def detect_objects_batch(self, frames):
+        """ Same as Detector.detect_objects_batch(). The frames are sent before the results are read. """
+        responses = self._requests([self._detect_message(frame) for frame in frames])
+        return [self._detections(response) for response in responses]
+
+
+    def add_box(self, frame, box, label, color=(0, 255, 0), thickness=2):
+        """ Same as Detector.add_box() """
+        if self._rnd is None:
+            self._rnd = renderer.Renderer()
+        return self._rnd.draw_boxes(frame, [box], [label], color, thickness)
+
+
+    def close(self):
+        self._sock.close()
+
+
+    @property
+    def labels(self):
+        return self.__labels
+
+
+#====================================================================================
+
+if __name__ == "__main__":
+
+    import detector
+
+    print("Starting detector ...")
+    dtc = detector.Detector(os.path.join(project_dir, model_dir))
+    server = InferenceServer(dtc, max_batch, max_wait_ms, max_queue)
+    try:
+        asyncio.run(server.serve(server_address))
+    except KeyboardInterrupt:
+        pass
+    print()
+    if server.batch_cnt > 0:
+        print(server.frame_cnt, "frames in", server.batch_cnt, "batches, average batch size:",
+              round(server.frame_cnt / server.batch_cnt, 2))
+    print("Done!")
@@ -0,0 +1,170 @@
+""" error_gallery.py
+
+This script creates a gallery of the images with the most errors of an evaluation run
+(as stored by 'evaluate_image_list.py', see 'results_store.py'), for a quick review in the browser.
+
+The images are ranked by the number of true objects without match, then by the number of estimated objects
+without match. For the worst N images, the detector is run again and the boxes are drawn in the colors of
+the class Evaluator (green: true object with match, yellow: true object without match,
+blue: estimated object with match, red: estimated object without match).
+The images are rendered in a pool of processes (one detector per process) and saved as:
+  - overlay images in full size
+  - thumbnails
+  - contact sheets (tiles of thumbnails with name and number of errors)
+  - index.html with the ranking, the thumbnails (linked to the overlay images) and the contact sheets
+
+SLW Oct-2026
+"""
+
+# Set files and paths ===================
+project_dir = "micro-organisms"
+image_dir = "images"
+model_dir = "model"
+results_dir = "results"
+image_list = "test_images.txt"
+gallery_dir = "gallery"
+worst_n = 100
+thumb_size = (320, 240)
+sheet_cols, sheet_rows = 5, 4
+workers = None          # number of processes, None: number of cores
+# =======================================
+
+import os
+import sys
+import glob
+import html
+import concurrent.futures
+import numpy as np
+import cv2
+import results_store
+
+_evl = None
+
+
+def rank_errors(true_results, est_results, n=100):
+    """ Returns a dataframe with the n images with the most errors:
+        columns 'image', 'true_errors' (true objects without match), 'est_errors' (estimated objects without match) """
+    true_errors = (true_results['match'] == False).groupby(true_results['image']).sum()
+    est_errors = (est_results['match'] == False).groupby(est_results['image']).sum()
+    errors = true_errors.to_frame('true_errors').join(est_errors.to_frame('est_errors'), how='outer').fillna(0)
+    errors = errors.astype(int).reset_index().rename(columns={'index': 'image'})
+    errors = errors[(errors['true_errors'] > 0) | (errors['est_errors'] > 0)]
+    errors = errors.sort_values(['true_errors', 'est_errors', 'image'], ascending=[False, False, True], kind='stable')
+    return errors.head(n).reset_index(drop=True)
+
+
+def _init_worker(model_path):
+    """ Builds the evaluator of a worker process """
+    global _evl
+    import evaluator
+    _evl = evaluator.Evaluator(model_path)
+
+
+def _thumbnail(img, size):
+    """ Downscales an image to fit into size (width, height), keeping the aspect ratio """
+    height, width = img.shape[:2]
+    scale = min(size[0] / width, size[1] / height)
+    return cv2.resize(img, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+
+def render(image_name, image_path, gallery_path, thumb_size):
+    """ Renders the overlay image and the thumbnail of an image (in a worker process).
+        Returns the image name and the thumbnail (None if the image is not found). """
+    _, _, img = _evl.evaluate_and_render(image_name, image_path)
+    if img is None:
+        return image_name, None
+    cv2.imwrite(os.path.join(gallery_path, "images", image_name + ".jpg"), img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    thumb = _thumbnail(img, thumb_size)
+    cv2.imwrite(os.path.join(gallery_path, "thumbs", image_name + ".jpg"), thumb, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    return image_name, thumb
+
+
+def contact_sheets(gallery_path, ranked, thumbs, thumb_size, cols=5, rows=4):
+    """ Writes the thumbnails as tiles to contact sheets. Returns the file names of the sheets. """
+    caption = 22
+    tile_w, tile_h = thumb_size[0], thumb_size[1] + caption
+    per_sheet = cols * rows
+    entries = [(rank, row) for rank, row in enumerate(ranked.itertuples(), 1) if thumbs.get(row.image) is not None]
+    sheets = []
+    for sheet_no, start in enumerate(range(0, len(entries), per_sheet), 1):
+        sheet = np.full((rows * tile_h, cols * tile_w, 3), 255, dtype=np.uint8)
+        for i, (rank, row) in enumerate(entries[start : start + per_sheet]):
+            thumb = thumbs[row.image]
+            x, y = (i % cols) * tile_w, (i // cols) * tile_h
+            sheet[y : y + thumb.shape[0], x : x + thumb.shape[1]] = thumb
+            text = str(rank) + ". " + row.image + " (" + str(row.true_errors) + "/" + str(row.est_errors) + ")"
+            cv2.putText(sheet, text[:40], (x + 4, y + thumb_size[1] + 16), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 0), 1)
+        file_name = "sheet_" + str(sheet_no).zfill(3) + ".jpg"
+        cv2.imwrite(os.path.join(gallery_path, file_name), sheet, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        sheets.append(file_name)
+    return sheets
+
+
+def write_index(gallery_path, title, ranked, thumbs, sheets):
+    """ Writes index.html with the ranking, the thumbnails and the contact sheets """
+    lines = ["<!DOCTYPE html>", "<html><head><meta charset='utf-8'><title>" + html.escape(title) + "</title>",
+             "<style>body{font-family:sans-serif} td{padding:4px;vertical-align:top} img{border:1px solid #ccc}</style>",
+             "</head><body>", "<h2>" + html.escape(title) + "</h2>",
+             "<p>Green: true object with match, yellow: true object without match, "
+             "blue: estimated object with match, red: estimated object without match.</p>",
+             "<p>Contact sheets: " + " ".join("<a href='" + s + "'>" + s + "</a>" for s in sheets) + "</p>",
+             "<table><tr><th>Rank</th><th>Image</th><th>True objects<br>without match</th>"
+             "<th>Estimated objects<br>without match</th><th></th></tr>"]
+    for rank, row in enumerate(ranked.itertuples(), 1):
+        name = html.escape(row.image)
+        if thumbs.get(row.image) is None:
+            cell = "not found"
+        else:
+            cell = "<a href='images/" + name + ".jpg'><img src='thumbs/" + name + ".jpg'></a>"
+        lines.append("<tr><td>" + str(rank) + "</td><td>" + name + "</td><td>" + str(row.true_errors) + "</td><td>" +
+                     str(row.est_errors) + "</td><td>" + cell + "</td></tr>")
+    lines += ["</table>", "</body></html>"]
+    with open(os.path.join(gallery_path, "index.html"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+#====================================================================================
+
+# The guard is needed for the worker processes
+if __name__ == "__main__":
+
+    print("Error gallery")
+    print(40 * "=")
+    print()
+
+    image_path = os.path.join(project_dir, image_dir)
+    model_path = os.path.join(project_dir, model_dir)
+    results_path = os.path.join(project_dir, results_dir, os.path.splitext(image_list)[0])
+    gallery_path = os.path.join(project_dir, gallery_dir, os.path.splitext(image_list)[0])
+
+    # Results of a run on one machine or of the shards of a run
+    folders = sorted(glob.glob(os.path.join(results_path, "shard-*")))
+    if len(folders) == 0:
+        folders = [results_path]
+    if not os.path.isdir(folders[0]):
+        print("Error: can't find results: '" + results_path + "' ! Please run evaluate_image_list.py first.")
+        sys.exit(1)
+    true_results, est_results, _ = results_store.merge_results(folders)
+    ranked = rank_errors(true_results, est_results, worst_n)
+    print(len(ranked), "images with errors selected from", true_results['image'].nunique(), "images")
+    if len(ranked) == 0:
+        print("No errors, nothing to show!")
+        sys.exit(0)
+
+    os.makedirs(os.path.join(gallery_path, "images"), exist_ok=True)
+    os.makedirs(os.path.join(gallery_path, "thumbs"), exist_ok=True)
+    thumbs = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                initargs=(model_path,)) as executor:
+        futures = [executor.submit(render, name, image_path, gallery_path, thumb_size) for name in ranked['image']]
+        for cnt, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            image_name, thumb = future.result()
+            thumbs[image_name] = thumb
+            print("- " + str(cnt) + " of " + str(len(futures)) + " images rendered", end='\r')
+    print()
+
+    sheets = contact_sheets(gallery_path, ranked, thumbs, thumb_size, sheet_cols, sheet_rows)
+    write_index(gallery_path, "Errors of '" + image_list + "'", ranked, thumbs, sheets)
+    print(len(sheets), "contact sheets written")
+    print("Gallery: " + os.path.join(gallery_path, "index.html"))
+    print("Done!")
@@ -1,20 +1,110 @@
 """ evaluate_image_list.py
 
+The results are written image by image to 'results_dir' (one folder per image list, see 'results_store.py').
+If the run is interrupted, start it again with --resume to skip the images already evaluated.
+Images that can't be read are not stored, so --resume tries them again.
+The summaries are computed from the stored results.
+The XML files and images of the next images are read in the background while the detector works on the current one
+(see 'image_reader.py'). The time the detector had to wait for them is shown as I/O stall time.
+
+To spread a run over several machines, start it on each machine with "--shard i/N" (i = 0 ... N-1).
+The images are assigned to the shards by a hash of the image name, so all machines agree without communication.
+Each shard writes its own results folder (results/<image list>/shard-i-of-N). Copy the folders to one machine
+(e.g. with rsync or scp) and combine them with
+    python evaluate_image_list.py merge <folder> <folder> ...
+This prints the same summary tables and error rankings as a run on one machine.
+
 SLW Oct-2024 - Dec-2024
 """
 
 import os
-import pandas as pd
+import sys
+import time
+import argparse
 import evaluator
+import summary
+import detector_server
+import results_store
+import image_reader
 
 # Set files and paths
 project_dir = "micro-organisms"
 image_dir = "images"
 image_file_lists = ["train_images.txt", "test_images.txt"]
 model_dir = "model"
+server_address = None   # e.g. "localhost:8555" to use a shared detector server (see 'detector_server.py')
+results_dir = "results"
+chunk_images = 500      # images per part of the results (checkpoint)
+prefetch_depth = 8      # images read in advance
+read_workers = 4        # threads to read the images
+
+parser = argparse.ArgumentParser(description="Evaluate image lists")
+parser.add_argument("command", nargs='?', default="evaluate", choices=["evaluate", "merge"])
+parser.add_argument("folders", nargs='*', help="merge: results folders of the shards")
+parser.add_argument("--resume", action="store_true", help="continue an interrupted run, skip evaluated images")
+parser.add_argument("--shard", default="", help="evaluate only shard i of N, e.g. 0/4")
+args = parser.parse_args()
+
+# Columns needed for the summary tables and the error ranking
+summary_columns = (['image', 'true_label', 'est_label', 'intersection', 'match'], ['est_idx', 'est_label', 'match'])
+
+
+def read_image_list(file_name):
+    """ Returns a list of tuples (position in the list, image name) of the XML files in an image list """
+    entries = []
+    with open(file_name, "r") as files:
+        for list_pos, image_file in enumerate(files.readlines()):
+            image_file = image_file.strip('\n')
+            pos = image_file.rfind('/')
+            if pos > 0:
+                image_file = image_file[pos + 1 :]
+            pos = image_file.rfind('.')
+            if pos < 0:
+                print("Error: can't identify file type on '" + image_file + "'. File skipped.")
+                continue
+            image_name = image_file[: pos]
+            image_filetype = image_file[pos+1 : ]
+            if image_filetype.casefold() == "xml".casefold():
+                entries.append((list_pos, image_name))
+    return entries
+
+
+if args.command == "merge":
+    # Combine the results folders of several machines, grouped by image list
+    print("Merge evaluation results")
+    print(40 * "=")
+    if len(args.folders) == 0:
+        print("Error: no results folders given!")
+    groups = {}
+    for folder in args.folders:
+        groups.setdefault(results_store.read_meta(folder).get('image_list', ""), []).append(folder)
+    file_lists = sorted(groups, key=lambda f: image_file_lists.index(f) if f in image_file_lists else len(image_file_lists))
+    for file_list in file_lists:
+        print()
+        print("Merging " + str(len(groups[file_list])) + " folders of '" + file_list + "' ...")
+        true_results, est_results, _ = results_store.merge_results(groups[file_list], summary_columns)
+        summary.print_summary(true_results, est_results, file_list)
+    if len(file_lists) > 0:
+        print(40 * '-')
+        summary.print_errors(true_results)
+    print("Done!")
+    sys.exit(0)
+
+# Shard of this machine
+shard, shards = 0, 1
+if len(args.shard) > 0:
+    try:
+        shard, shards = [int(v) for v in args.shard.split('/')]
+    except ValueError:
+        shards = 0
+    if shards < 1 or shard < 0 or shard >= shards:
+        print("Error: --shard expects i/N with 0 <= i < N, e.g. 0/4!")
+        sys.exit(1)
 
 print("Evaluate image lists")
 print(40 * "=")
+if shards > 1:
+    print("Shard", shard, "of", shards)
 print()
 
 # Directories
@@ -22,110 +112,72 @@ image_path = os.path.join(project_dir, image_dir)
 model_path = os.path.join(project_dir, model_dir)
 
 # Start evaluator
-evl = evaluator.Evaluator(model_path)
+if server_address is None:
+    evl = evaluator.Evaluator(model_path)
+else:
+    evl = evaluator.Evaluator(model_path, dtc=detector_server.DetectorClient(server_address))
 
 # Evaluate the lists of images
 for file_list in image_file_lists:
 
-    # Create dataframes to capture the results
-    true_results = pd.DataFrame(columns = ['image', 'true_idx', 'true_label', 'est_idx', 'est_label', 'score', 'intersection', 'match'])
-    est_results = pd.DataFrame(columns = ['image', 'est_idx', 'est_label', 'score', 'match'])
-    true_row_idx = 0
-    est_row_idx = 0
-
-    # Open image file list
-    with open(os.path.join(project_dir, file_list), "r") as files:
-        img_lst = files.readlines()
-    if len(img_lst) == 0:
+    # Read image file list
+    entries = read_image_list(os.path.join(project_dir, file_list))
+    if len(entries) == 0:
         print("File list is empty. Nothing to do!")
         print()
         continue
-        
+    list_images = len(entries)
+    if shards > 1:
+        entries = [(pos, name) for pos, name in entries if results_store.shard_of(name, shards) == shard]
+
+    # Results of the list (of the shard)
+    results_path = os.path.join(project_dir, results_dir, os.path.splitext(file_list)[0])
+    if shards > 1:
+        results_path = os.path.join(results_path, "shard-" + str(shard) + "-of-" + str(shards))
+    meta = {'image_list': file_list, 'shard': shard, 'shards': shards, 'images': len(entries),
+            'list_images': list_images, 'model': model_dir}
+    writer = results_store.ResultWriter(results_path, chunk_images, resume=args.resume, meta=meta,
+                                        label_names=evl.label_names)
+    if len(writer.processed) > 0:
+        print(len(writer.processed), "images already evaluated, resuming ...")
+
     # Work on image by image
     print()
     print("Evaluating images ...")
-    for image_file in img_lst:
-        image_file = image_file.strip('\n')
-        pos = image_file.rfind('/')
-        if pos > 0:
-            image_file = image_file[pos + 1 :]
-        pos = image_file.rfind('.')
-        if pos < 0:
-            print("Error: can't identify file type on '" + image_file + "'. File skipped.")
-            continue
-        image_name = image_file[: pos]
-        image_filetype = image_file[pos+1 : ]
-        if image_filetype.casefold() == "xml".casefold():
+    start = time.perf_counter()
+    reader = image_reader.ImageReader(lambda entry: evl.read_image(entry[1], image_path),
+                                      [entry for entry in entries if entry[1] not in writer.processed],
+                                      prefetch_depth, read_workers)
+    try:
+        for (list_pos, image_name), (img, true_classes, true_boxes) in reader:
             print("- " + image_name + 20 * ' ', end='\r')
-            # Get true and estimated objects
-            true_lst, est_lst, _ = evl.evaluate_img(image_name, image_path, verbose=False, show_img=False)
-            # Add findings to dataframes
-            for true_obj in true_lst:
-                true_results.loc[true_row_idx] = [image_name] + true_obj
-                true_row_idx += 1
-            for est_obj in est_lst:
-                est_results.loc[est_row_idx] = [image_name] + est_obj
-                est_row_idx += 1
+            if img is None:
+                # Not stored, so the image is tried again with --resume
+                writer.add_failed(image_name)
+                continue
+            # Get true and estimated objects (as structured arrays with the list position as image id)
+            true_arr, est_arr = evl.evaluate_arrays(img, true_classes, true_boxes, list_pos)
+            # Add findings to the results
+            writer.add_arrays(image_name, true_arr, est_arr, list_pos)
+    finally:
+        # Write the results of the last images, also on <ctrl-c>
+        writer.close()
 
     # Clean up
     print("Done!" + 20 * ' ')
+    if len(writer.failed) > 0:
+        print(len(writer.failed), "images could not be read and are not stored (tried again with --resume)")
+    duration = time.perf_counter() - start
+    if reader.count > 0:
+        print("I/O stall: {:.2f} s of {:.2f} s ({:.1f}%), {} of {} images not ready".format(
+            reader.stall_time, duration, reader.stall_time * 100 / duration, reader.stall_count, reader.count))
     evl.cleanup()
 
-    # Show summary
-    print()
-    print("Summary for '" + file_list + "'")
-    print((14 + len(file_list)) * '=')
-    print()
-    true_cnt = len(true_results)
-    matches = true_results['match'].count()
-    correct = true_results[true_results['true_label'] == true_results['est_label']]['image'].count()
-    localization = true_results['intersection'].sum()
-    est_cnt = len(est_results)
-    matchless = est_results[est_results['match'] == False]['est_idx'].count()
-    print("All classes " + 62 * '-')
-    title_str = "True Obj     Matches  Correct Matches  Localization  Est.Obj  Not Matching"
-    print(title_str)
-    if true_cnt > 0 and matches > 0 and est_cnt > 0:
-        print("   {:5d}{:5d}/{:5.1f}%     {:5d}/{:5.1f}%        {:5.1f}%    {:5d}  {:5d}/{:5.1f}%".format(
-            true_cnt, matches, matches*100/true_cnt, correct, correct*100/true_cnt, 
-            localization*100/matches, est_cnt, matchless, matchless*100/est_cnt))
-    else:
-        print("   {:5d}           -                -             -    {:5d}             -".format(
-            true_cnt, est_cnt))
-            
-    print()
-
-    print("By class " + 85 * '-')
-    print("Class               " + title_str)
-    class_lst = true_results['true_label'].value_counts()
-    for c in class_lst.index:
-        true_results_byclass = true_results[true_results['true_label'] == c]
-        true_cnt = len(true_results_byclass)
-        matches = true_results_byclass['match'].count()
-        correct = true_results_byclass[true_results_byclass['true_label'] == true_results_byclass['est_label']]['image'].count()
-        localization = true_results_byclass['intersection'].sum()
-        est_results_byclass = est_results[est_results['est_label'] == c]
-        est_cnt = len(est_results_byclass)
-        matchless = est_results_byclass[est_results_byclass['match'] == False]['est_idx'].count()
-        if true_cnt > 0 and matches > 0 and est_cnt > 0:
-            print("{:20s}   {:5d}{:5d}/{:5.1f}%     {:5d}/{:5.1f}%        {:5.1f}%    {:5d}  {:5d}/{:5.1f}%".format(
-                c, true_cnt, matches, matches*100/true_cnt, correct, correct*100/true_cnt, 
-                localization*100/matches, est_cnt, matchless, matchless*100/est_cnt))
-        else:
-            print("{:20s}   {:5d}           -                -             -    {:5d}             -".format(
-                c, true_cnt, est_cnt))
-
-            
-    print()
+    # Show summary from the stored results
+    true_results, est_results = results_store.read_results(results_path, summary_columns)
+    summary.print_summary(true_results, est_results, file_list)
     
 print(40 * '-')    
-print("Test images with the highest number of errors:")
-true_results_nomatch = true_results[true_results['match'] == False]
-if len(true_results_nomatch) == 0:
-    print("None!")
-else:
-    print(true_results_nomatch['image'].value_counts().head(10))
-print()
+summary.print_errors(true_results)
     
 print("Done!")
-
@@ -30,16 +30,22 @@ The visualisation shows the true and estimated objects with coloured rectangles.
 - blue = estimated object with matching true object
 - red = estimated object without matching true object
 
+The next images are evaluated in the background, and the results are cached (see 'prefetcher.py').
+
 SLW Dec-2024
 """
 
 import os
+import cv2
 import evaluator
+import detector_server
+import prefetcher
 
 # Directories
 project_dir = "."
 image_dir = "images"
 model_dir = "model"
+server_address = None   # e.g. "localhost:8555" to use a shared detector server (see 'detector_server.py')
 
 # Print instructions
 print("Evaluate images ...")
@@ -56,9 +62,14 @@ model_path = os.path.join(project_dir, model_dir)
 threshold = 0.5
 image_height, image_width = 768, 1024
 image_step = 10
+prefetch_ahead = 3                 # number of images evaluated in advance
+cache_bytes = 512 * 1024 * 1024    # memory for images already shown or evaluated
 
 # Start evaluator
-evl = evaluator.Evaluator(model_path)
+if server_address is None:
+    evl = evaluator.Evaluator(model_path)
+else:
+    evl = evaluator.Evaluator(model_path, dtc=detector_server.DetectorClient(server_address))
 
 # Image directory
 print("Reading image directory ...")
@@ -69,23 +80,25 @@ pnt = 0
 print(files_cnt, "images found")
 print()
 
+def load_image(idx):
+    """ Evaluates an image and adds the boxes. Runs in the prefetch thread. """
+    f = image_files[idx]
+    return evl.evaluate_and_render(f[:f.rfind('.')], image_path, threshold)
+
+# The next images are evaluated in the background
+prefetch = prefetcher.Prefetcher(load_image, files_cnt, prefetch_ahead, image_step, cache_bytes)
+
 while True:
     # Read image
     f = image_files[pnt]
-    
-    pos = f.rfind('.')
-    if pos > 0:
-        f = f[:pos]
-    else:
-        print("Error: could not fin filetype:", f)
-        continue
-    
-    if f[pos+1 :].casefold() == "xml".casefold():
-        continue
-    
+    f = f[:f.rfind('.')]
     print(str(pnt+1) + ": " + f)
     # Evaluate image
-    true_lst, est_lst, key = evl.evaluate_img(f, image_path, verbose=False, show_img=True)
+    true_lst, est_lst, img = prefetch.get(pnt)
+    key = 0
+    if img is not None:
+        cv2.imshow("", img)
+        key = cv2.waitKey(0) & 0xff
     print("True Objects:")
     print("Idx  True Label           Est. Label           Correct  Score Localization")
     for true_obj in true_lst:
@@ -124,5 +137,6 @@ while True:
             break
 
 # Cleanup
+prefetch.close()
 evl.cleanup()
 print("Done!")
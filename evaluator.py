@@ -12,18 +12,42 @@ The method returns:
     (1) List of true objects and the matches with the predicted objects.
     (2) List of estimated objects with prediction scores and matches with the true objects.
     (3) If visualization is on: key pressed, otherwise: 0
+The steps of 'evaluate_img()' are also available as methods: 'read_image()' (XML and image file),
+'evaluate_objects()' (detector plus 'match_objects()') and 'render_img()' (boxes in the colors below).
+The stages decode (image file), xml_parse, matching and render are timed if metrics are enabled (see 'metrics.py').
+
+For large evaluations, 'evaluate_arrays()' and 'match_arrays()' return the same results as NumPy structured arrays
+(see 'true_dtype' and 'est_dtype') with an image id and label ids instead of label names (see 'label_names').
+The arrays of many images can be concatenated and converted into dataframes at once (see 'summary.from_arrays()').
 
 SLW Dec-2024
 """
 
 import os
+import threading
+from xml.sax.saxutils import unescape
+import numpy as np
 import cv2
 import detector
+import renderer
+import metrics
+
+# Structured arrays of the true and the estimated objects (label -1: no label, est_idx -1: no estimated object)
+true_dtype = np.dtype([('image', 'i4'), ('true_idx', 'i4'), ('true_label', 'i2'), ('est_idx', 'i4'),
+                       ('est_label', 'i2'), ('score', 'f4'), ('intersection', 'f8'), ('match', '?')])
+est_dtype = np.dtype([('image', 'i4'), ('est_idx', 'i4'), ('est_label', 'i2'), ('score', 'f4'), ('match', '?')])
+
 
 class Evaluator:
     
-    def __init__(self, model_path):
-        self._dtc = detector.Detector(model_path, verbose=False)
+    def __init__(self, model_path, dtc=None):
+        # 'dtc' can be used to pass a detector, e.g. a DetectorClient (see 'detector_server.py')
+        self._dtc = detector.Detector(model_path, verbose=False) if dtc is None else dtc
+        self._rnd = renderer.Renderer(self._dtc.labels)
+        # Label ids: the labels of the detector plus the labels only found in XML files
+        self._label_names = list(self._dtc.labels)
+        self._label_ids = {name: idx for idx, name in enumerate(self._label_names)}
+        self._label_lock = threading.Lock()
         # Colors
         self._green = (0, 255, 0)     # true box with match
         self._yellow = (0, 255, 255)  # true box without match
@@ -41,6 +65,7 @@ class Evaluator:
         return label, end_pos + len(tag) + 3
         
         
+    @metrics.timed("xml_parse")
     def _decode_xml(self, filename, image_path):
         """ Decodes XML label files, returns image filename, classes and boxes """
         filename_details = filename.split('.')
@@ -50,13 +75,20 @@ class Evaluator:
             if filename_details[1].casefold() != "xml".casefold():
                 print("Error: decode_xml - xml file expected, '" + filename + "' received!")
                 return "none", [], []
-        with open(os.path.join(image_path, filename), "r") as xml_file:
+        xml_path = os.path.join(image_path, filename)
+        if not os.path.isfile(xml_path):
+            # File systems with case-sensitive names (e.g. Linux)
+            xml_path = xml_path[:-3] + xml_path[-3:].swapcase()
+            if not os.path.isfile(xml_path):
+                return "none", [], []
+        with open(xml_path, "r") as xml_file:
             s = xml_file.read()
         # Extract image filename
         img_filename, pos = self._extract_tag(s, "filename")
         if len(img_filename) == 0 or pos <= 0:
             print("Error: decode_xml - can't find filename-tag!")
             return "none", [], []
+        img_filename = unescape(img_filename)
         s = s[pos :]
         # Extract width and height
         width, pos = self._extract_tag(s, "width")
@@ -78,7 +110,7 @@ class Evaluator:
             class_name, pos = self._extract_tag(s, "name")
             if len(class_name) == 0 or pos <= 0:
                 break
-            classes.append(class_name)
+            classes.append(unescape(class_name))
             s = s[pos : ]
             xmin, pos = self._extract_tag(s, "xmin")
             if len(xmin) == 0 or pos <= 0:
@@ -140,11 +172,70 @@ class Evaluator:
         if verbose:
             print(fname + "processing file '" + img_filename + "'")
             print(fname + str(len(true_classes)) + " true objects found")
+        with metrics.timer("decode"):
+            img = cv2.imread(os.path.join(image_path, img_filename))
+        true_lst, est_lst, est_boxes = self.evaluate_objects(img, true_classes, true_boxes, verbose,
+                                                             probability_threshold, intersection_threshold)
+
+        # Show image
+        key = 0
+        if show_img:
+            img = self.render_img(img, true_boxes, true_lst, est_boxes, est_lst)
+            # Show the image and wait for the keyboard
+            cv2.imshow("", img)
+            key = cv2.waitKey(0) & 0xff
         
-        # Get estimations from detector and add estimated boxes to images
+        return true_lst, est_lst, key
+
+
+    def read_image(self, filename, image_path):
+        """ Reads the XML file and the image file of an image (filename without file type).
+            Returns the image, the true classes and the true boxes. The image is None if not found or not readable. """
+        img_filename, true_classes, true_boxes = self._decode_xml(filename + '.XML', image_path)
+        if img_filename == "none":
+            print("read_image: Error: files not found: " + filename)
+            return None, [], []
+        with metrics.timer("decode"):
+            img = cv2.imread(os.path.join(image_path, img_filename))
+        if img is None:
+            print("read_image: Error: can't read image file: " + img_filename)
+            return None, [], []
+        return img, true_classes, true_boxes
+
+
+    def evaluate_and_render(self, filename, image_path,
+                            probability_threshold = 0.5, intersection_threshold = 0.5):
+        """ Evaluates an image like evaluate_img(), but returns the image including boxes instead of showing it.
+            Returns the list of true objects, the list of estimated objects and the image (None if not found). """
+        img, true_classes, true_boxes = self.read_image(filename, image_path)
+        if img is None:
+            return [], [], None
+        true_lst, est_lst, est_boxes = self.evaluate_objects(img, true_classes, true_boxes, False,
+                                                             probability_threshold, intersection_threshold)
+        img = self.render_img(img, true_boxes, true_lst, est_boxes, est_lst)
+        return true_lst, est_lst, img
+
+
+    def evaluate_objects(self, img, true_classes, true_boxes, verbose=False,
+                         probability_threshold = 0.5, intersection_threshold = 0.5):
+        """ Runs the detector on an image and matches the estimated objects with the true objects.
+            Returns the list of true objects and the list of estimated objects (see evaluate_img())
+            plus the boxes of the estimated objects. """
+        est_boxes, est_classes, est_scores = self._dtc.detect_objects(img)
+        return self.match_objects(true_classes, true_boxes, est_boxes, est_classes, est_scores, verbose,
+                                  probability_threshold, intersection_threshold)
+
+
+    @metrics.timed("matching")
+    def match_objects(self, true_classes, true_boxes, est_boxes, est_classes, est_scores, verbose=False,
+                      probability_threshold = 0.5, intersection_threshold = 0.5):
+        """ Matches the estimated objects (as returned by the detector) with the true objects.
+            Returns the same as evaluate_objects(). """
+
+        fname = "evaluate_img: "
+
+        # Keep the estimations above the threshold
         true_lst = []
-        img = cv2.imread(os.path.join(image_path, img_filename))
-        est_boxes, est_classes, est_scores = self._dtc.detect_objects(img)   
         for idx in range(10):
             if est_scores[idx] < probability_threshold:
                 break
@@ -214,33 +305,121 @@ class Evaluator:
             for eo in est_lst:
                 print(fname + " - " + str(eo))
             print()
-        
-        # Show image
-        key = 0
-        if show_img:
-            # Add true boxes to images
-            for idx, to in enumerate(true_lst):
-                if to[6]:
-                    flag = "okay" if to[1] == to[3] else "wrong"
-                    img = self._dtc.add_box(img, true_boxes[idx], to[1] + " (" + flag + ")", self._green)
-                else:
-                    img = self._dtc.add_box(img, true_boxes[idx], to[1] + " (not found)", self._yellow)               
-            # Add estimatores to image
-            for idx, eo in enumerate(est_lst):
-                if eo[3]:
-                    img = self._dtc.add_box(img, est_boxes[idx], "", self._blue)
-                else:
-                    img = self._dtc.add_box(img, est_boxes[idx], "", self._red)
-                    
-            # Show the image and wait for the keyboard
-            cv2.imshow("", img)
-            key = cv2.waitKey(0) & 0xff
-        
-        return true_lst, est_lst, key
+
+        return true_lst, est_lst, est_boxes
+
+
+    def evaluate_arrays(self, img, true_classes, true_boxes, image_id=0,
+                        probability_threshold = 0.5, intersection_threshold = 0.5):
+        """ Runs the detector on an image and matches the estimated objects with the true objects.
+            Returns structured arrays of the true objects and of the estimated objects (see match_arrays()). """
+        est_boxes, est_classes, est_scores = self._dtc.detect_objects(img)
+        return self.match_arrays(true_classes, true_boxes, est_boxes, est_classes, est_scores, image_id,
+                                 probability_threshold, intersection_threshold)
+
+
+    def _label_id(self, name):
+        label_id = self._label_ids.get(name)
+        if label_id is None:
+            with self._label_lock:
+                label_id = self._label_ids.get(name)
+                if label_id is None:
+                    label_id = len(self._label_names)
+                    self._label_names.append(name)
+                    self._label_ids[name] = label_id
+        return label_id
+
+
+    @metrics.timed("matching")
+    def match_arrays(self, true_classes, true_boxes, est_boxes, est_classes, est_scores, image_id=0,
+                     probability_threshold = 0.5, intersection_threshold = 0.5):
+        """ Matches the estimated objects with the true objects like match_objects(), all objects at once.
+            Returns two structured arrays, true objects (true_dtype) and estimated objects (est_dtype),
+            with 'image_id' in the field 'image' and the label ids (index in label_names). """
+        # Keep the estimations above the threshold, same as match_objects()
+        est_scores = np.asarray(est_scores)
+        below = np.flatnonzero(est_scores[:10] < probability_threshold)
+        n = int(below[0]) if len(below) > 0 else max(0, min(len(est_scores), 10) - 1)
+        est_boxes = np.asarray(est_boxes, dtype=np.float64)[:n].reshape(-1, 4)
+        est_classes = np.asarray(est_classes[:n], dtype=np.int16)
+        est_scores = est_scores[:n]
+        true_boxes = np.asarray(true_boxes, dtype=np.float64).reshape(-1, 4)
+
+        # Intersection of each true box (rows) with each estimated box (columns) as fraction of the estimated area
+        ymin = np.maximum(true_boxes[:, None, 0], est_boxes[None, :, 0])
+        xmin = np.maximum(true_boxes[:, None, 1], est_boxes[None, :, 1])
+        ymax = np.minimum(true_boxes[:, None, 2], est_boxes[None, :, 2])
+        xmax = np.minimum(true_boxes[:, None, 3], est_boxes[None, :, 3])
+        overlap = (ymax > ymin) & (xmax > xmin)
+        est_areas = (est_boxes[:, 2] - est_boxes[:, 0]) * (est_boxes[:, 3] - est_boxes[:, 1])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factors = np.where(overlap, (ymax - ymin) * (xmax - xmin) / est_areas[None, :], 0.0)
+
+        # Estimated object with the largest intersection (the first one for equal values)
+        true_cnt = len(true_boxes)
+        if n > 0:
+            est_idx = np.argmax(factors, axis=1)
+            local_max = factors[np.arange(true_cnt), est_idx]
+        else:
+            est_idx = np.zeros(true_cnt, dtype=np.int64)
+            local_max = np.zeros(true_cnt)
+        found = local_max > 0
+
+        true_arr = np.zeros(true_cnt, dtype=true_dtype)
+        true_arr['image'] = image_id
+        true_arr['true_idx'] = np.arange(true_cnt)
+        true_arr['true_label'] = [self._label_id(c) for c in true_classes]
+        true_arr['est_idx'] = np.where(found, est_idx, -1)
+        if n > 0:
+            true_arr['est_label'] = np.where(found, est_classes[est_idx], -1)
+            true_arr['score'] = np.where(found, est_scores[est_idx], 0.0)
+        else:
+            true_arr['est_label'] = -1
+        true_arr['intersection'] = np.where(found, local_max, 0.0)
+        true_arr['match'] = found & (local_max > intersection_threshold)
+
+        est_arr = np.zeros(n, dtype=est_dtype)
+        est_arr['image'] = image_id
+        est_arr['est_idx'] = np.arange(n)
+        est_arr['est_label'] = est_classes
+        est_arr['score'] = est_scores
+        est_arr['match'][est_idx[found]] = True
+        return true_arr, est_arr
+
+
+    @metrics.timed("render")
+    def render_img(self, img, true_boxes, true_lst, est_boxes, est_lst):
+        """ Adds the true and estimated boxes to an image, using the colors as described above """
+        texts, colors = [], []
+        # True boxes
+        for to in true_lst:
+            if to[6]:
+                texts.append(to[1] + " (" + ("okay" if to[1] == to[3] else "wrong") + ")")
+                colors.append(self._green)
+            else:
+                texts.append(to[1] + " (not found)")
+                colors.append(self._yellow)
+        # Estimators
+        for eo in est_lst:
+            texts.append("")
+            colors.append(self._blue if eo[3] else self._red)
+        boxes = list(true_boxes[:len(true_lst)]) + list(est_boxes[:len(est_lst)])
+        return self._rnd.draw_boxes(img, boxes, texts, colors)
     
     
     def cleanup(self):
         cv2.destroyAllWindows()
+
+
+    @property
+    def detector(self):
+        return self._dtc
+
+
+    @property
+    def label_names(self):
+        """ Names of the label ids of evaluate_arrays() and match_arrays() """
+        return self._label_names
         
 
 #===================================================================================================
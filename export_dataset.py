@@ -0,0 +1,268 @@
+""" export_dataset.py
+
+This script packages a checked image folder (see 'check_images.py') for training.
+It writes the image/label pairs straight into sharded files, one shard per worker task:
+  - TFRecord shards with tf.train.Example records as expected by the TensorFlow object detection API
+    (encoded image, image size, normalized boxes, class names and class ids), or
+  - zip shards with stored (uncompressed) entries, as JPEG and PNG files are compressed already.
+The TFRecord format is written directly, so neither tensorflow nor protobuf is needed for the export.
+The images are not decoded; the image size is taken from the XML file.
+
+Class ids are assigned in the order of the label list, starting at 1 (as in the label map for training).
+If no label list is given, the labels are sorted by frequency, as shown by 'check_images.py'.
+
+Dependencies: none (recommended for TFRecord: google_crc32c or crc32c, the checksums in pure Python are very slow)
+
+SLW Oct-2026
+"""
+
+# Set files and paths ===================
+project_dir = "."
+image_dir = "images"
+export_dir = "export"
+export_name = "images"
+export_format = "tfrecord"    # "tfrecord" or "zip"
+images_per_shard = 1000
+labels = []                   # empty: labels sorted by frequency
+# =======================================
+
+import os
+import struct
+import zipfile
+import concurrent.futures
+import annotation
+
+# Checksums ========================================================================
+
+crc32c_native = True
+try:
+    import google_crc32c
+    def _crc32c(data):
+        return google_crc32c.value(data)
+except ImportError:
+    try:
+        import crc32c
+        def _crc32c(data):
+            return crc32c.crc32c(data)
+    except ImportError:
+        # Fallback: byte by byte in Python, about 100x slower than the export without checksums
+        crc32c_native = False
+        _crc_table = []
+        for _i in range(256):
+            _crc = _i
+            for _j in range(8):
+                _crc = (_crc >> 1) ^ 0x82F63B78 if _crc & 1 else _crc >> 1
+            _crc_table.append(_crc)
+
+        def _crc32c(data):
+            crc = 0xFFFFFFFF
+            table = _crc_table
+            for b in data:
+                crc = table[(crc ^ b) & 0xFF] ^ (crc >> 8)
+            return crc ^ 0xFFFFFFFF
+
+
+def _masked_crc(data):
+    crc = _crc32c(data)
+    return (((crc >> 15) | (crc << 17)) + 0xA282EAD8) & 0xFFFFFFFF
+
+
+# tf.train.Example encoding ========================================================
+
+def _varint(n):
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def _field(number, data):
+    """ Length-delimited protobuf field """
+    return _varint((number << 3) | 2) + _varint(len(data)) + data
+
+
+def _bytes_feature(values):
+    return _field(1, b"".join(_field(1, v) for v in values))
+
+
+def _float_feature(values):
+    return _field(2, _field(1, struct.pack("<" + str(len(values)) + "f", *values)))
+
+
+def _int64_feature(values):
+    return _field(3, _field(1, b"".join(_varint(v) for v in values)))
+
+
+def _example(features):
+    """ Encodes a dictionary of features as tf.train.Example """
+    s = b"".join(_field(1, _field(1, key.encode()) + _field(2, value))
+                 for key, value in sorted(features.items()))
+    return _field(1, s)
+
+
+def _tfrecord(data):
+    length = struct.pack("<Q", len(data))
+    return length + struct.pack("<I", _masked_crc(length)) + data + struct.pack("<I", _masked_crc(data))
+
+
+def _encode_example(image_path, name, ending, xml_ending, label_ids):
+    """ Builds the tf.train.Example for one image/label pair. Returns the record or an error string. """
+    xml_name = name + '.' + xml_ending
+    img_filename, width, height, classes, boxes = annotation.read_annotation(os.path.join(image_path, xml_name))
+    if img_filename == "none" or width <= 0 or height <= 0:
+        return None, "can't decode '" + xml_name + "'"
+    unknown = [c for c in classes if c not in label_ids]
+    if len(unknown) > 0:
+        return None, "unknown label '" + unknown[0] + "' in '" + xml_name + "'"
+    with open(os.path.join(image_path, name + '.' + ending), "rb") as f:
+        encoded = f.read()
+    img_format = b"png" if ending.casefold() == "png" else b"jpeg"
+    features = {
+        "image/height": _int64_feature([height]),
+        "image/width": _int64_feature([width]),
+        "image/filename": _bytes_feature([(name + '.' + ending).encode()]),
+        "image/source_id": _bytes_feature([(name + '.' + ending).encode()]),
+        "image/encoded": _bytes_feature([encoded]),
+        "image/format": _bytes_feature([img_format]),
+        "image/object/bbox/xmin": _float_feature([min(max(b[0] / width, 0.0), 1.0) for b in boxes]),
+        "image/object/bbox/ymin": _float_feature([min(max(b[1] / height, 0.0), 1.0) for b in boxes]),
+        "image/object/bbox/xmax": _float_feature([min(max(b[2] / width, 0.0), 1.0) for b in boxes]),
+        "image/object/bbox/ymax": _float_feature([min(max(b[3] / height, 0.0), 1.0) for b in boxes]),
+        "image/object/class/text": _bytes_feature([c.encode() for c in classes]),
+        "image/object/class/label": _int64_feature([label_ids[c] for c in classes]),
+    }
+    return _example(features), ""
+
+
+# Shards ===========================================================================
+
+def _write_shard(shard_file, fmt, image_path, pairs, label_ids):
+    """ Writes one shard. Runs in a worker process. Returns count of images and list of errors. """
+    cnt = 0
+    errors = []
+    tmp_file = shard_file + ".tmp"
+    if fmt == "zip":
+        with zipfile.ZipFile(tmp_file, "w", compression=zipfile.ZIP_STORED) as zf:
+            for name, ending, xml_ending in pairs:
+                # Both files are read before writing, so a pair is either complete or missing
+                entries = []
+                try:
+                    for file_name in (name + '.' + ending, name + '.' + xml_ending):
+                        file_path = os.path.join(image_path, file_name)
+                        with open(file_path, "rb") as f:
+                            entries.append((zipfile.ZipInfo.from_file(file_path, file_name), f.read()))
+                except OSError as e:
+                    errors.append("can't read '" + name + "' (" + str(e) + ")")
+                    continue
+                for info, data in entries:
+                    zf.writestr(info, data, compress_type=zipfile.ZIP_STORED)
+                cnt += 1
+    else:
+        with open(tmp_file, "wb") as f:
+            for name, ending, xml_ending in pairs:
+                try:
+                    record, error = _encode_example(image_path, name, ending, xml_ending, label_ids)
+                except OSError as e:
+                    record, error = None, "can't read '" + name + "' (" + str(e) + ")"
+                if record is None:
+                    errors.append(error)
+                    continue
+                f.write(_tfrecord(record))
+                cnt += 1
+    os.replace(tmp_file, shard_file)
+    return cnt, errors
+
+
+def find_pairs(image_path):
+    """ Returns a sorted list of (name, image ending, xml ending) tuples for all images with a label file """
+    images, xml_files = {}, {}
+    for f in os.listdir(image_path):
+        pos = f.rfind('.')
+        if pos <= 0:
+            continue
+        ending = f[pos+1:]
+        if ending.casefold() in ("jpg", "jpeg", "png"):
+            images[f[:pos]] = ending
+        elif ending.casefold() == "xml":
+            xml_files[f[:pos]] = ending
+    return sorted((name, ending, xml_files[name]) for name, ending in images.items() if name in xml_files)
+
+
+def labels_by_frequency(image_path, pairs):
+    """ Returns the list of labels sorted by the number of images, as shown by 'check_images.py' """
+    counts = {}
+    for name, _, xml_ending in pairs:
+        _, _, _, classes, _ = annotation.read_annotation(os.path.join(image_path, name + '.' + xml_ending))
+        if len(classes) > 0:
+            counts[classes[0]] = counts.get(classes[0], 0) + 1
+        for c in classes[1:]:
+            counts.setdefault(c, 0)
+    return sorted(counts, key=lambda c: -counts[c])
+
+
+def export_shards(image_path, pairs, labels, export_path, export_name="images", fmt="tfrecord",
+                  images_per_shard=1000, workers=None, verbose=True):
+    """ Writes the image/label pairs to sharded TFRecord or zip files in parallel.
+        - 'pairs' is a list of (name, image ending, xml ending) tuples, e.g. ("Snap-846", "jpg", "xml")
+        - 'labels' is the list of class names, class ids start at 1
+        Returns the list of shard files and the number of images exported. """
+    if fmt not in ("tfrecord", "zip"):
+        print("Error: export_shards - unknown format '" + fmt + "'!")
+        return [], 0
+    if fmt == "tfrecord" and not crc32c_native:
+        print(60 * "!")
+        print("Warning: no CRC32C package found, the checksums are computed in pure Python.")
+        print("The export will be very slow. Please install it with: pip install google-crc32c")
+        print(60 * "!")
+    os.makedirs(export_path, exist_ok=True)
+    label_ids = {l: idx + 1 for idx, l in enumerate(labels)}
+    shard_cnt = max(1, (len(pairs) + images_per_shard - 1) // images_per_shard)
+    shard_files = []
+    for i in range(shard_cnt):
+        if fmt == "zip":
+            shard_name = "{}-{:05d}-of-{:05d}.zip".format(export_name, i, shard_cnt)
+        else:
+            shard_name = "{}.tfrecord-{:05d}-of-{:05d}".format(export_name, i, shard_cnt)
+        shard_files.append(os.path.join(export_path, shard_name))
+    # Interleave the pairs, so that each shard gets a mix of all classes
+    total = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_write_shard, shard_files[i], fmt, image_path,
+                                   pairs[i::shard_cnt], label_ids) for i in range(shard_cnt)]
+        for done_cnt, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            cnt, errors = future.result()
+            total += cnt
+            for error in errors:
+                print("Error: " + error + " - image skipped!")
+            if verbose:
+                print(done_cnt, "of", shard_cnt, "shards written", end='\r')
+    if verbose:
+        print()
+    return shard_files, total
+
+
+#====================================================================================
+
+if __name__ == "__main__":
+
+    image_path = os.path.join(project_dir, image_dir)
+    export_path = os.path.join(project_dir, export_dir)
+
+    print("Exporting images from '" + image_path + "' to '" + export_path + "'")
+    pairs = find_pairs(image_path)
+    print(len(pairs), "image/label pairs found")
+    if len(pairs) == 0:
+        print("Nothing to do!")
+    else:
+        if len(labels) == 0:
+            labels = labels_by_frequency(image_path, pairs)
+        print("Labels:", labels)
+        shard_files, cnt = export_shards(image_path, pairs, labels, export_path, export_name,
+                                         export_format, images_per_shard)
+        print(cnt, "images written to", len(shard_files), export_format, "shard(s)")
+    print("Done!")
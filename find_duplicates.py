@@ -0,0 +1,268 @@
+""" find_duplicates.py
+
+This script finds duplicate and near-duplicate images in an image folder.
+Video-derived datasets often contain many almost identical frames. They inflate the training time
+and leak between the train and the test list.
+
+Each image is reduced to a 64 bit perceptual hash (dHash or pHash). The hashes are computed in parallel
+and kept as a packed uint64 array, which is cached in the project folder ('image_hashes.npz'),
+so that only new or changed images are hashed again.
+Near-duplicates are found by multi-index hashing: the hash is split into (max_distance + 1) chunks.
+Two hashes within the Hamming distance max_distance share at least one identical chunk.
+So only images with an identical chunk are compared, with vectorized numpy operations.
+
+The script also checks the overlap between the image lists (e.g. 'train_images.txt' and 'test_images.txt'),
+both for identical names and for near-duplicates.
+
+Dependencies: OpenCV, numpy
+
+SLW Oct-2026
+"""
+
+# Set files and paths ===================
+project_dir = "."
+image_dir = "images"
+image_lists = ["train_images.txt", "test_images.txt"]
+hash_file = "image_hashes.npz"
+hash_method = "dhash"     # "dhash" or "phash"
+max_distance = 4          # max. number of different bits for near-duplicates
+# =======================================
+
+import os
+import concurrent.futures
+import cv2
+import numpy as np
+
+# Hashes ===========================================================================
+
+def _bits_to_hash(bits):
+    """ Packs an array of 64 booleans into an unsigned 64 bit integer """
+    return int(np.packbits(bits.reshape(-1)).view('>u8')[0])
+
+
+def dhash(gray):
+    """ Difference hash: compares neighbouring pixels of a 9x8 thumbnail """
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    return _bits_to_hash(small[:, 1:] > small[:, :-1])
+
+
+def phash(gray):
+    """ Perceptual hash: compares the low frequencies of the DCT with their median """
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    return _bits_to_hash(low > np.median(low.reshape(-1)[1:]))
+
+
+def _hash_file(path, method):
+    # The reduced decoding lets the JPEG decoder skip most of the work
+    gray = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if gray is None:
+        return None
+    return phash(gray) if method == "phash" else dhash(gray)
+
+
+def compute_hashes(paths, method="dhash", workers=None, verbose=True):
+    """ Computes the hashes of a list of image files in parallel.
+        Returns a uint64 array and a boolean array marking the files that could be read. """
+    hashes = np.zeros(len(paths), dtype=np.uint64)
+    valid = np.zeros(len(paths), dtype=bool)
+    # OpenCV releases the GIL, so threads are sufficient
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for idx, h in enumerate(executor.map(_hash_file, paths, [method] * len(paths))):
+            if h is not None:
+                hashes[idx] = h
+                valid[idx] = True
+            if verbose and idx % 1000 == 0:
+                print(idx, end='\r')
+    if verbose:
+        print(20 * ' ', end='\r')
+    return hashes, valid
+
+
+def load_hashes(image_path, image_files, cache_file=None, method="dhash", workers=None, verbose=True):
+    """ Returns the hashes for the image files and a boolean array marking the files that could be read.
+        Uses the cache file for unchanged images. """
+    stamps = np.array([os.stat(os.path.join(image_path, f)).st_mtime_ns for f in image_files], dtype=np.int64)
+    hashes = np.zeros(len(image_files), dtype=np.uint64)
+    todo = np.ones(len(image_files), dtype=bool)
+    valid = np.ones(len(image_files), dtype=bool)
+    if cache_file is not None and os.path.isfile(cache_file):
+        cache = np.load(cache_file)
+        if str(cache['method']) == method:
+            cached = {f: i for i, f in enumerate(cache['names'].tolist())}
+            for idx, f in enumerate(image_files):
+                i = cached.get(f)
+                if i is not None and cache['stamps'][i] == stamps[idx]:
+                    hashes[idx] = cache['hashes'][i]
+                    todo[idx] = False
+    todo_idx = np.flatnonzero(todo)
+    if verbose:
+        print(len(todo_idx), "image(s) to hash")
+    if len(todo_idx) > 0:
+        new_hashes, new_valid = compute_hashes([os.path.join(image_path, image_files[i]) for i in todo_idx],
+                                               method, workers, verbose)
+        hashes[todo_idx] = new_hashes
+        valid[todo_idx] = new_valid
+        for i in todo_idx[~new_valid]:
+            print("Error: can't read '" + image_files[i] + "'!")
+            stamps[i] = -1
+        if cache_file is not None:
+            np.savez(cache_file, names=np.array(image_files), stamps=stamps, hashes=hashes,
+                     method=np.array(method))
+    return hashes, valid
+
+
+# Search ===========================================================================
+
+_popcount_table = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def hamming_distance(a, b):
+    """ Vectorized Hamming distance between two uint64 arrays """
+    x = np.bitwise_xor(a, b)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x).astype(np.uint8)
+    return _popcount_table[x.view(np.uint8).reshape(-1, 8)].sum(axis=1, dtype=np.uint8)
+
+
+def _equal_key_pairs(keys):
+    """ Returns all index pairs (i, j), i < j, with identical keys without a loop over the pairs """
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    n = len(keys)
+    first, second = [], []
+    active = np.arange(n - 1)
+    k = 1
+    while len(active) > 0:
+        active = active[sorted_keys[active] == sorted_keys[active + k]]
+        first.append(order[active])
+        second.append(order[active + k])
+        k += 1
+        active = active[active + k < n]
+    if len(first) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    i, j = np.concatenate(first), np.concatenate(second)
+    return np.minimum(i, j), np.maximum(i, j)
+
+
+def find_near_duplicates(hashes, max_distance=4):
+    """ Finds all pairs of hashes within the given Hamming distance.
+        Returns three arrays: first index, second index and distance. """
+    # Identical hashes are grouped first, so that large groups of equal frames are cheap
+    unique, inverse = np.unique(hashes, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    pairs = []
+    # Exact duplicates
+    i, j = _equal_key_pairs(inverse)
+    pairs.append((i, j, np.zeros(len(i), dtype=np.uint8)))
+    # Near-duplicates between unique hashes by multi-index hashing
+    if max_distance > 0 and len(unique) > 1:
+        chunk_cnt = min(max_distance + 1, 64)
+        bounds = np.linspace(0, 64, chunk_cnt + 1).astype(int)
+        found = []
+        for c in range(chunk_cnt):
+            width = int(bounds[c + 1] - bounds[c])
+            mask = np.uint64((1 << width) - 1)
+            keys = (unique >> np.uint64(bounds[c])) & mask
+            ui, uj = _equal_key_pairs(keys)
+            near = hamming_distance(unique[ui], unique[uj]) <= max_distance
+            found.append(ui[near] * len(unique) + uj[near])
+        # A pair can be found by several chunks
+        found = np.unique(np.concatenate(found))
+        ui, uj = found // len(unique), found % len(unique)
+        dist = hamming_distance(unique[ui], unique[uj])
+        # Expand the unique hashes to all images with these hashes
+        members = np.argsort(inverse, kind='stable')
+        starts = np.searchsorted(inverse[members], np.arange(len(unique) + 1))
+        sizes = starts[1:] - starts[:-1]
+        rep_i, rep_j = np.repeat(ui, sizes[ui] * sizes[uj]), np.repeat(uj, sizes[ui] * sizes[uj])
+        rep_d = np.repeat(dist, sizes[ui] * sizes[uj])
+        # Running position within each block of size_i * size_j pairs
+        block = np.repeat(sizes[uj], sizes[ui] * sizes[uj])
+        offset = np.arange(len(rep_i)) - np.repeat(np.cumsum(sizes[ui] * sizes[uj]) - sizes[ui] * sizes[uj],
+                                                   sizes[ui] * sizes[uj])
+        i = members[starts[rep_i] + offset // block]
+        j = members[starts[rep_j] + offset % block]
+        pairs.append((np.minimum(i, j), np.maximum(i, j), rep_d))
+    return (np.concatenate([p[0] for p in pairs]), np.concatenate([p[1] for p in pairs]),
+            np.concatenate([p[2] for p in pairs]))
+
+
+def group_duplicates(n, first, second):
+    """ Assigns a group id (the smallest member index) to each image, based on the pairs found """
+    groups = np.arange(n)
+    while True:
+        low = np.minimum(groups[first], groups[second])
+        changed = np.any(groups[first] != low) or np.any(groups[second] != low)
+        if not changed:
+            break
+        np.minimum.at(groups, first, low)
+        np.minimum.at(groups, second, low)
+        groups = groups[groups]
+    return groups
+
+
+def read_image_list(file_name):
+    """ Reads an image list file and returns the set of image names (without folder and file type) """
+    names = set()
+    with open(file_name, "r") as f:
+        for line in f:
+            line = line.strip().replace('\\', '/')
+            if len(line) == 0:
+                continue
+            line = line[line.rfind('/') + 1 :]
+            pos = line.rfind('.')
+            names.add(line[:pos] if pos > 0 else line)
+    return names
+
+
+def check_duplicates(project_dir, image_path, image_lists=(), cache_file=None, method="dhash",
+                     max_distance=4, workers=None, verbose=True):
+    """ Reports duplicate images in the image folder and the overlap between the image lists.
+        Returns the number of near-duplicate pairs and the number of list overlaps. """
+    image_files = sorted(f for f in os.listdir(image_path)
+                         if f[f.rfind('.') + 1 :].casefold() in ("jpg", "jpeg", "png"))
+    hashes, valid = load_hashes(image_path, image_files, cache_file, method, workers, verbose)
+    # Images that could not be read have no hash and are left out
+    image_files = [f for f, v in zip(image_files, valid) if v]
+    hashes = hashes[valid]
+    first, second, dist = find_near_duplicates(hashes, max_distance)
+    names = [f[:f.rfind('.')] for f in image_files]
+    groups = group_duplicates(len(image_files), first, second)
+    group_ids, group_sizes = np.unique(groups, return_counts=True)
+    print(len(first), "duplicate pair(s) with a distance of up to", max_distance, "bit(s),",
+          np.count_nonzero(dist == 0), "of them identical")
+    print(int(np.sum(group_sizes[group_sizes > 1])), "image(s) in", np.count_nonzero(group_sizes > 1),
+          "group(s) of duplicates")
+    for g in group_ids[group_sizes > 1][np.argsort(-group_sizes[group_sizes > 1], kind='stable')][:10]:
+        members = np.flatnonzero(groups == g)
+        print("- " + ", ".join(names[m] for m in members[:5]) + (" ..." if len(members) > 5 else ""),
+              "(" + str(len(members)) + ")")
+
+    # Overlap between image lists
+    overlap_cnt = 0
+    lists = [(l, os.path.join(project_dir, l)) for l in image_lists]
+    lists = [(l, read_image_list(p)) for l, p in lists if os.path.isfile(p)]
+    for a in range(len(lists)):
+        for b in range(a + 1, len(lists)):
+            (name_a, set_a), (name_b, set_b) = lists[a], lists[b]
+            same = set_a & set_b
+            in_a = np.array([n in set_a for n in names], dtype=bool)
+            in_b = np.array([n in set_b for n in names], dtype=bool)
+            cross = (in_a[first] & in_b[second]) | (in_b[first] & in_a[second])
+            print("Overlap '" + name_a + "' / '" + name_b + "':", len(same), "identical name(s),",
+                  np.count_nonzero(cross), "near-duplicate pair(s)")
+            for i, j, d in list(zip(first[cross], second[cross], dist[cross]))[:10]:
+                print("- " + names[i] + " ~ " + names[j] + " (distance " + str(d) + ")")
+            overlap_cnt += len(same) + int(np.count_nonzero(cross))
+    return len(first), overlap_cnt
+
+
+#====================================================================================
+
+if __name__ == "__main__":
+
+    image_path = os.path.join(project_dir, image_dir)
+    print("Finding duplicates in '" + image_path + "' ...")
+    check_duplicates(project_dir, image_path, image_lists, os.path.join(project_dir, hash_file),
+                     hash_method, max_distance)
+    print("Done!")
@@ -0,0 +1,72 @@
+""" image_reader.py
+
+Class to read images in the background while the detector works on the current image.
+It is used by the batch scripts (e.g. 'evaluate_image_list.py'), which walk through a list of images once.
+For the interactive scripts, which move forward and backward, see 'prefetcher.py'.
+
+The reader calls a load function (e.g. parse the XML file and decode the image) for the next 'depth' items
+in a small pool of threads, and returns the results in the order of the items.
+Reading files and decoding images releases the GIL, so disk (or network) and the detector work at the same time.
+
+The time the caller has to wait for the next result is the I/O stall time.
+It is reported by stall_time and stall_count (and recorded as stage "io_stall" if metrics are enabled).
+
+Usage:
+    reader = ImageReader(load, items, depth=8, workers=4)
+    for item, result in reader:
+        ...
+    print(reader.stall_time)
+
+SLW Oct-2026
+"""
+
+import time
+import collections
+import concurrent.futures
+import metrics
+
+_end = object()
+
+
+class ImageReader:
+    def __init__(self, load, items, depth=8, workers=4):
+        """ - 'load' is a function that takes an item and returns the result for it
+            - 'items' is an iterable of items (e.g. image names)
+            - 'depth' is the number of items loaded in advance
+            - 'workers' is the number of threads """
+        self._load = load
+        self._items = items
+        self._depth = max(1, depth)
+        self._workers = max(1, workers)
+        self.stall_time = 0.0   # time waited for results in s
+        self.stall_count = 0    # number of results that were not ready
+        self.count = 0          # number of results returned
+
+    def __iter__(self):
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._workers)
+        pending = collections.deque()
+        items = iter(self._items)
+        try:
+            for item in items:
+                pending.append((item, executor.submit(self._load, item)))
+                if len(pending) >= self._depth:
+                    break
+            while len(pending) > 0:
+                item, future = pending.popleft()
+                if not future.done():
+                    start = time.perf_counter()
+                    result = future.result()
+                    stall = time.perf_counter() - start
+                    self.stall_time += stall
+                    self.stall_count += 1
+                    if metrics.enabled:
+                        metrics.record("io_stall", stall, start)
+                else:
+                    result = future.result()
+                next_item = next(items, _end)
+                if next_item is not _end:
+                    pending.append((next_item, executor.submit(self._load, next_item)))
+                self.count += 1
+                yield item, result
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,285 @@
+""" metrics.py
+
+Lightweight timing instrumentation for the detector, the evaluator and the scripts.
+The durations of the stages (e.g. decode, preprocess, invoke, postprocess, xml_parse, matching, render)
+are recorded in histograms with fixed buckets, events are recorded in counters.
+When metrics are disabled (default), timer() returns a shared dummy object and count() returns at once,
+so the instrumentation costs only a function call.
+
+Metrics are enabled with enable() or with the environment variable TFOD_METRICS, a comma-separated list of outputs:
+    summary                 summary table at exit
+    prometheus=<file>       Prometheus text format, rewritten every 'interval' seconds (e.g. for the node exporter)
+    jsonl=<file>            one JSON line per interval with all histograms and counters
+    trace=<file>            Chrome trace (chrome://tracing or https://ui.perfetto.dev), written at exit
+    interval=<seconds>      export interval, default 10
+Example: TFOD_METRICS="summary,jsonl=metrics.jsonl,trace=trace.json" python evaluate_image_list.py
+
+Usage in code:
+    with metrics.timer("invoke"):
+        ...
+    metrics.count("frames")
+
+    @metrics.timed("matching")
+    def match_objects(...):
+
+SLW Oct-2026
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+
+# Upper bounds of the histogram buckets in s (plus +Inf)
+buckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+max_trace_events = 1000000
+
+enabled = False
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_trace = None
+_outputs = {}
+_exporter = None
+_start_time = time.time()
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, duration):
+        idx = 0
+        while idx < len(buckets) and duration > buckets[idx]:
+            idx += 1
+        self.counts[idx] += 1
+        self.count += 1
+        self.sum += duration
+        if duration > self.max:
+            self.max = duration
+
+    def quantile(self, q):
+        """ Estimates a quantile from the buckets (upper bound of the bucket, max for the last bucket) """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        total = 0
+        for idx, cnt in enumerate(self.counts):
+            total += cnt
+            if total >= rank:
+                return min(buckets[idx], self.max) if idx < len(buckets) else self.max
+        return self.max
+
+
+def record(name, duration, start=None):
+    """ Records a duration in s for a stage. 'start' (time.perf_counter()) is used for the trace. """
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = _Histogram()
+        histogram.add(duration)
+        if _trace is not None and len(_trace) < max_trace_events and start is not None:
+            _trace.append({'name': name, 'ph': 'X', 'ts': round(start * 1e6, 1), 'dur': round(duration * 1e6, 1),
+                           'pid': os.getpid(), 'tid': threading.get_ident()})
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start, self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_null_timer = _NullTimer()
+
+
+def timer(name):
+    """ Context manager to time a stage """
+    return _Timer(name) if enabled else _null_timer
+
+
+def timed(name):
+    """ Decorator to time a function as a stage """
+    def decorator(function):
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start, start)
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    """ Increments a counter """
+    if not enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def snapshot():
+    """ Returns a dictionary with all histograms and counters """
+    with _lock:
+        stages = {name: {'count': h.count, 'sum': h.sum, 'max': h.max, 'buckets': list(h.counts)}
+                  for name, h in _histograms.items()}
+        return {'time': time.time(), 'uptime': time.time() - _start_time,
+                'stages': stages, 'counters': dict(_counters)}
+
+
+def prometheus_text():
+    """ Returns the metrics in the Prometheus text format """
+    lines = ["# HELP tfod_stage_seconds Duration of the processing stages",
+             "# TYPE tfod_stage_seconds histogram"]
+    with _lock:
+        for name, h in sorted(_histograms.items()):
+            total = 0
+            for idx, cnt in enumerate(h.counts):
+                total += cnt
+                le = repr(buckets[idx]) if idx < len(buckets) else "+Inf"
+                lines.append('tfod_stage_seconds_bucket{stage="' + name + '",le="' + le + '"} ' + str(total))
+            lines.append('tfod_stage_seconds_sum{stage="' + name + '"} ' + repr(h.sum))
+            lines.append('tfod_stage_seconds_count{stage="' + name + '"} ' + str(h.count))
+        lines += ["# HELP tfod_events_total Number of events", "# TYPE tfod_events_total counter"]
+        for name, value in sorted(_counters.items()):
+            lines.append('tfod_events_total{event="' + name + '"} ' + str(value))
+    return "\n".join(lines) + "\n"
+
+
+def summary_table():
+    """ Returns the summary table of all stages and counters as a string """
+    lines = ["Stage                  Count     Total s    Mean ms     p50 ms     p95 ms     Max ms"]
+    with _lock:
+        for name, h in sorted(_histograms.items(), key=lambda item: -item[1].sum):
+            lines.append("{:20s} {:7d} {:11.3f} {:10.3f} {:10.3f} {:10.3f} {:10.3f}".format(
+                name, h.count, h.sum, h.sum * 1000 / max(1, h.count),
+                h.quantile(0.5) * 1000, h.quantile(0.95) * 1000, h.max * 1000))
+        for name, value in sorted(_counters.items()):
+            lines.append("{:20s} {:7d}".format(name, value))
+    return "\n".join(lines)
+
+
+def _write_file(file_name, text):
+    """ Writes a file in one step, so readers never see a partial file """
+    tmp_name = file_name + ".tmp"
+    with open(tmp_name, "w") as f:
+        f.write(text)
+    os.replace(tmp_name, file_name)
+
+
+def export():
+    """ Writes the periodic outputs (Prometheus file and JSON lines) """
+    if 'prometheus' in _outputs:
+        _write_file(_outputs['prometheus'], prometheus_text())
+    if 'jsonl' in _outputs:
+        with open(_outputs['jsonl'], "a") as f:
+            f.write(json.dumps(snapshot()) + "\n")
+
+
+def _export_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            export()
+        except OSError as e:
+            print("metrics: Error: export failed:", e, file=sys.stderr)
+
+
+def _at_exit():
+    try:
+        export()
+        if _trace is not None:
+            with open(_outputs['trace'], "w") as f:
+                json.dump({'traceEvents': _trace, 'displayTimeUnit': 'ms'}, f)
+    except OSError as e:
+        print("metrics: Error: export failed:", e, file=sys.stderr)
+    if _outputs.get('summary') and len(_histograms) + len(_counters) > 0:
+        print()
+        print("Metrics " + 76 * '-')
+        print(summary_table())
+
+
+def enable(summary=True, prometheus=None, jsonl=None, trace=None, interval=10.0):
+    """ Enables the metrics with the given outputs (file names or None) """
+    global enabled, _trace, _exporter
+    _outputs.update({'summary': summary})
+    for key, value in (('prometheus', prometheus), ('jsonl', jsonl), ('trace', trace)):
+        if value is not None:
+            _outputs[key] = value
+    if trace is not None and _trace is None:
+        _trace = []
+    if not enabled:
+        atexit.register(_at_exit)
+    if _exporter is None and ('prometheus' in _outputs or 'jsonl' in _outputs):
+        _exporter = threading.Thread(target=_export_loop, args=(interval,), daemon=True)
+        _exporter.start()
+    enabled = True
+
+
+def _enable_from_env():
+    value = os.environ.get("TFOD_METRICS", "")
+    if len(value) == 0:
+        return
+    options = {'summary': False, 'interval': 10.0}
+    for item in value.split(','):
+        key, _, arg = item.strip().partition('=')
+        if key == "summary":
+            options['summary'] = True
+        elif key in ("prometheus", "jsonl", "trace") and len(arg) > 0:
+            options[key] = arg
+        elif key == "interval" and len(arg) > 0:
+            try:
+                interval = float(arg)
+            except ValueError:
+                interval = 0.0
+            if interval > 0:
+                options['interval'] = interval
+            else:
+                print("metrics: Error: invalid interval '" + arg + "' in TFOD_METRICS", file=sys.stderr)
+        else:
+            print("metrics: Error: unknown option '" + item + "' in TFOD_METRICS", file=sys.stderr)
+    enable(**options)
+
+
+_enable_from_env()
+
+
+#====================================================================================
+
+if __name__ == "__main__":
+
+    # Demo: time a few dummy stages and print the outputs
+    enable(summary=True)
+    for i in range(100):
+        with timer("sleep_1ms"):
+            time.sleep(0.001)
+        count("loops")
+    print(prometheus_text())
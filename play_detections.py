@@ -0,0 +1,117 @@
+""" play_detections.py
+
+This script searches the detections of a video as recorded by 'analyze_videofile.py' (see 'detection_store.py')
+and plays the video from the frames found, with the stored boxes. The detector is not needed.
+
+Query: frames where 'query_label' appears at least 'query_count' times.
+Keys:
+  - 'n' / 'p' - jump to the next / previous range of frames found
+  - 'd' / 's' - one frame forward / backward
+  - <space> - pause / play
+  - <esc>, <return> or <q> - exit
+
+SLW Oct-2026
+"""
+
+# Directories
+video_file = "<my_video_file.mp4>"
+project_dir = "<my_project>"
+video_dir = "<my_video_folder>"
+store_file = "<my_video_file>.detections.npz"
+
+# Query
+query_label = "<my_label>"
+query_count = 1
+threshold = 0.5         # threshold for the boxes shown
+display_size = None     # e.g. (1280, 720) to show a downscaled copy of the frames
+
+import os
+import sys
+import time
+import cv2
+import detection_store
+import renderer
+
+print("Play detections")
+print(30 * "=")
+print()
+
+# Detection store
+store_path = os.path.join(project_dir, video_dir, store_file)
+if not os.path.isfile(store_path):
+    print("Error: can't find detection store: '" + store_path + "' !")
+    sys.exit(1)
+store = detection_store.DetectionStore.load(store_path)
+print(store.frame_count, "frames stored in", store.run_count, "runs")
+print("Labels:", ", ".join(store.labels))
+fps = store.fps if store.fps > 0 else 25.0
+
+# Query
+start = time.perf_counter()
+ranges = store.frames_with(query_label, query_count)
+duration = time.perf_counter() - start
+print()
+print(len(ranges), "ranges with at least", query_count, "x '" + query_label + "' ({:.2f} ms)".format(duration * 1000))
+for first, end in ranges[:20]:
+    print("- frames {:8d} - {:8d}   {:8.1f} s - {:8.1f} s".format(first, end - 1, first / fps, (end - 1) / fps))
+if len(ranges) > 20:
+    print("- ...")
+if len(ranges) == 0:
+    print("Nothing to show!")
+    sys.exit(0)
+print()
+print("Press 'n' / 'p' for the next / previous range, <space> to pause and <esc> to exit.")
+
+# Video
+video_stream = cv2.VideoCapture(os.path.join(project_dir, video_dir, video_file))
+if not video_stream.isOpened():
+    print("Error: could not open the video file:", video_file)
+    sys.exit(1)
+rnd = renderer.Renderer(store.labels)
+
+range_idx = 0
+frame_no = int(ranges[0, 0])
+video_stream.set(1, frame_no)   # seek (position of the next frame)
+paused = False
+running = True
+while running:
+    success, img = video_stream.read()
+    if not success:
+        print("End of video")
+        break
+    boxes, classes, scores = store.detections(frame_no)
+    img = rnd.draw_detections(img, boxes, classes, scores, threshold, max_objects=len(classes),
+                              display_size=display_size, inclusive=True)
+    cv2.putText(img, "frame " + str(frame_no) + "  range " + str(range_idx + 1) + "/" + str(len(ranges)),
+                (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+    cv2.imshow(video_file, img)
+    key = cv2.waitKey(0 if paused else max(1, int(1000 / fps))) & 0xff
+    seek = frame_no + 1
+    if key in (13, 27, 113):   # <return>, <esc>, <q>
+        running = False
+    elif key == ord(' '):
+        paused = not paused
+    elif key == ord('n'):
+        range_idx = min(range_idx + 1, len(ranges) - 1)
+        seek = int(ranges[range_idx, 0])
+    elif key == ord('p'):
+        range_idx = max(range_idx - 1, 0)
+        seek = int(ranges[range_idx, 0])
+    elif key == ord('s'):
+        seek = max(0, frame_no - 1)
+        paused = True
+    elif key == ord('d'):
+        paused = True
+    elif paused:
+        seek = frame_no
+    if seek != frame_no + 1:
+        video_stream.set(1, seek)
+    else:
+        # Follow the ranges while playing
+        while range_idx + 1 < len(ranges) and seek >= ranges[range_idx + 1, 0]:
+            range_idx += 1
+    frame_no = seek
+
+print("Closing video stream")
+video_stream.release()
+cv2.destroyAllWindows()
@@ -0,0 +1,126 @@
+""" preannotate.py
+
+This script writes pre-annotations for a folder of images, so the labelers only need to correct the boxes
+instead of starting from scratch. It runs the detector on all images without XML file and writes
+a Pascal VOC XML file per image (format of labelImg, as read by 'evaluator.py' and 'check_images.py'),
+with the detections above the threshold in pixel coordinates.
+
+The work is done in three stages that run in parallel:
+  - reading and decoding the images (pool of threads)
+  - the detector (batches of images, or a detector server)
+  - writing the XML files (pool of threads)
+Images that already have an XML file are skipped, and the XML files are written in one step (temporary file
+plus rename). So the script can be stopped at any time and started again to resume.
+
+Note: images without detections get an XML file without objects (unless 'write_empty' is False).
+'check_images.py' reports them, since they still need to be labeled.
+
+SLW Oct-2026
+"""
+
+# Set files and paths ===================
+project_dir = "micro-organisms"
+image_dir = "unlabeled"
+model_dir = "model"
+server_address = None   # e.g. "localhost:8555" to use a shared detector server (see 'detector_server.py')
+threshold = 0.5
+write_empty = True      # write XML files for images without detections
+batch_size = 8
+read_workers = 4
+write_workers = 2
+# =======================================
+
+import os
+import sys
+import time
+import concurrent.futures
+import detector
+import detector_server
+import annotation
+import score_unlabeled
+
+
+def detections_to_objects(labels, boxes, classes, scores, width, height, threshold=0.5):
+    """ Returns the classes and the pixel boxes of the detections above the threshold """
+    obj_classes, obj_boxes = [], []
+    for box, c, score in zip(boxes, classes, scores):
+        if score < threshold or c < 0 or c >= len(labels):
+            continue
+        obj_classes.append(labels[c])
+        obj_boxes.append(annotation.to_pixel(box, width, height))
+    return obj_classes, obj_boxes
+
+
+def preannotate(dtc, image_path, image_files, folder, threshold=0.5, write_empty=True,
+                batch_size=8, read_workers=4, write_workers=2, verbose=True):
+    """ Writes the XML files for the images. Returns the number of XML files written and the number of objects. """
+    labels = dtc.labels
+    written, objects = 0, 0
+    pending = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=write_workers) as writer:
+        for batch in score_unlabeled.read_batches(image_path, image_files, batch_size, read_workers):
+            found = []
+            for image_file, img in batch:
+                if img is None:
+                    print("Error: can't read '" + image_file + "'. File skipped.")
+                else:
+                    found.append((image_file, img))
+            if len(found) == 0:
+                continue
+            results = dtc.detect_objects_batch([img for _, img in found])
+            for (image_file, img), (boxes, classes, scores) in zip(found, results):
+                height, width = img.shape[:2]
+                depth = img.shape[2] if img.ndim == 3 else 1
+                obj_classes, obj_boxes = detections_to_objects(labels, boxes, classes, scores, width, height, threshold)
+                if len(obj_classes) == 0 and not write_empty:
+                    continue
+                xml_file = os.path.join(image_path, os.path.splitext(image_file)[0] + ".xml")
+                pending.append(writer.submit(annotation.write_annotation, xml_file, image_file, width, height,
+                                             obj_classes, obj_boxes, folder, depth))
+                written += 1
+                objects += len(obj_classes)
+            # Keep the number of pending writes bounded, and report errors of the writer
+            while len(pending) > 4 * batch_size:
+                pending.pop(0).result()
+            if verbose:
+                print("- " + str(written) + " XML files written" + 10 * ' ', end='\r')
+        for future in pending:
+            future.result()
+    if verbose:
+        print(str(written) + " XML files written" + 10 * ' ')
+    return written, objects
+
+
+#====================================================================================
+
+if __name__ == "__main__":
+
+    print("Pre-annotate images")
+    print(40 * "=")
+    print()
+
+    image_path = os.path.join(project_dir, image_dir)
+    if not os.path.isdir(image_path):
+        print("Error: can't find image path: '" + image_path + "' !")
+        sys.exit(1)
+
+    print("Starting detector ...")
+    if server_address is None:
+        dtc = detector.Detector(os.path.join(project_dir, model_dir))
+    else:
+        dtc = detector_server.DetectorClient(server_address)
+
+    # Remove temporary files of an interrupted run
+    for f in os.listdir(image_path):
+        if f.endswith(".xml.tmp"):
+            os.remove(os.path.join(image_path, f))
+
+    print("Writing XML files for the images without XML file ...")
+    start = time.perf_counter()
+    written, objects = preannotate(dtc, image_path, score_unlabeled.unlabeled_images(image_path), image_dir,
+                                   threshold, write_empty, batch_size, read_workers, write_workers)
+    duration = time.perf_counter() - start
+    print(objects, "objects in", written, "XML files")
+    if written > 0:
+        print("{:.0f} images per hour".format(written * 3600 / duration))
+    print("Done!")
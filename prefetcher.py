@@ -0,0 +1,119 @@
+""" prefetcher.py
+
+Class to load images in the background while the user looks at the current image.
+It is used by the interactive scripts 'analyze_images.py' and 'evaluate_images.py'.
+
+The prefetcher calls a load function (e.g. read image, run detector and add boxes) for the images
+that are likely to be requested next: the following images and the images +/- 'step' away,
+which are reached with the keys 'f' and 'a'. The results are kept in an LRU cache that is bounded by memory,
+so moving back to an image is instant as well.
+
+All load calls run in one single worker thread, so the detector is never used by two threads at the same time.
+
+Methods:
+- get() - returns the result for an index, waits if it is not ready yet
+- close() - stops the worker thread
+
+SLW Oct-2026
+"""
+
+import threading
+import collections
+
+
+def _size_of(result):
+    """ Estimates the memory of a result by adding up the numpy arrays in it """
+    if hasattr(result, 'nbytes'):
+        return result.nbytes
+    if isinstance(result, (tuple, list)):
+        return sum(_size_of(r) for r in result)
+    return 0
+
+
+class Prefetcher:
+    def __init__(self, load, count, ahead=3, step=10, max_bytes=512 * 1024 * 1024):
+        """ - 'load' is a function that takes an index and returns the result for it
+            - 'count' is the number of images
+            - 'ahead' is the number of following images to be prefetched
+            - 'step' is the step size for fast forward and rewind
+            - 'max_bytes' is the memory limit for the cache """
+        self._load = load
+        self._count = count
+        self._ahead = ahead
+        self._step = step
+        self._max_bytes = max_bytes
+        self._cache = collections.OrderedDict()   # index -> (result, size)
+        self._errors = {}
+        self._cache_bytes = 0
+        self._wanted = []
+        self._current = -1
+        self._running = True
+        self._condition = threading.Condition()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+
+    def _neighbours(self, idx):
+        """ Indexes in the order of their probability to be requested next """
+        lst = [idx + i for i in range(1, self._ahead + 1)] + [idx - 1, idx + self._step, idx - self._step]
+        lst = [i % self._count if i < 0 else min(i, self._count - 1) for i in lst]
+        return [i for i in dict.fromkeys(lst) if i != idx]
+
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not any(i not in self._cache for i in self._wanted):
+                    self._condition.wait()
+                if not self._running:
+                    return
+                idx = [i for i in self._wanted if i not in self._cache][0]
+            try:
+                result, error = self._load(idx), None
+            except Exception as e:
+                result, error = None, e
+            with self._condition:
+                if error is not None:
+                    self._errors[idx] = error
+                    self._wanted = [i for i in self._wanted if i != idx]
+                else:
+                    size = _size_of(result)
+                    self._cache[idx] = (result, size)
+                    self._cache_bytes += size
+                    self._evict()
+                    if self._cache_bytes > self._max_bytes and idx != self._current:
+                        # No room left for prefetching
+                        self._cache_bytes -= self._cache.pop(idx)[1]
+                        self._wanted = [i for i in self._wanted if i in self._cache or i == self._current]
+                self._condition.notify_all()
+
+
+    def _evict(self):
+        """ Removes the least recently used results, but never the wanted ones """
+        for idx in list(self._cache.keys()):
+            if self._cache_bytes <= self._max_bytes:
+                break
+            if idx != self._current and idx not in self._wanted:
+                self._cache_bytes -= self._cache.pop(idx)[1]
+
+
+    def get(self, idx):
+        """ Returns the result for an index and starts prefetching its neighbours """
+        with self._condition:
+            self._current = idx
+            self._errors.pop(idx, None)
+            self._wanted = [idx] + self._neighbours(idx)
+            self._condition.notify_all()
+            while idx not in self._cache and idx not in self._errors:
+                self._condition.wait()
+            if idx in self._errors:
+                raise self._errors.pop(idx)
+            self._cache.move_to_end(idx)
+            return self._cache[idx][0]
+
+
+    def close(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._worker.join()
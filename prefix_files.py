@@ -1,11 +1,14 @@
 """ prefix_files.py
 
 A pretty simple script that renames all files in a folder with a prefix.
+The renaming is done by 'dataset_fixup.py': the <filename> tags of the XML files are corrected as well,
+and the renaming can be undone with 'python dataset_fixup.py --undo'.
 
 SLW 12-2024
 """
 
 import os
+import dataset_fixup
 
 # Directories
 project_dir = "."
@@ -14,27 +17,22 @@ image_path = os.path.join(project_dir, image_dir)
 
 # Prefix
 prefix = "my_class"
-prefix_len = len(prefix)
 
 print("Renaming files in '" + image_path + "'")
-files = os.listdir(image_path)
-cnt, skipped = 0, 0
-if len(files) == 0:
+fixup = dataset_fixup.plan(image_path, prefix, replace_blanks=False, normalize_extensions=False, fix_xml=True)
+if len(fixup.files) == 0:
     print("The folder is empty!!!")
 else:
-    print(len(files), "files found.")
+    print(len(fixup.files), "files found.")
+    dataset_fixup.print_plan(fixup)
     response = input("Proceed? (Y/N) ")
-    if response[0] in ('y', 'Y'):
-        for name in files:
-            if len(name) < prefix_len or name[:prefix_len+1] != (prefix + '_'):
-                new_name = prefix + '_' + name
-                os.rename(os.path.join(image_path, name), os.path.join(image_path, new_name))
-                cnt += 1
-            else:
-                skipped += 1               
-        print(cnt, "files renamed.")
-        print(skipped, "files already prefixed and skipped.")
-        print("Done!")
+    if response[:1] in ('y', 'Y'):
+        result = dataset_fixup.apply(image_path, fixup)
+        if result is not None:
+            print(result[0], "files renamed.")
+            print(result[1], "XML files corrected.")
+            print(fixup.unchanged, "files already prefixed and skipped.")
+            print("Done!")
     else:
         print("Cancelled!")
 print()
@@ -0,0 +1,114 @@
+""" renderer.py
+
+Class to draw all detections of a frame in one call.
+It produces the same boxes and labels as Detector.add_box(), but it is made for crowded frames at video rate:
+  - box coordinates are calculated for all boxes at once with numpy
+  - the label patches (white box with black text) are rendered once per label and score
+    and then copied into the frame
+  - optionally, the boxes are drawn on a downscaled copy of the frame for display,
+    so the full-resolution frame is neither resized nor changed
+
+Methods:
+- draw_detections() - adds the detections as returned by Detector.detect_objects() to a frame
+- draw_boxes() - adds a list of boxes with individual labels and colors to a frame
+
+Dependencies: OpenCV, numpy
+
+SLW Oct-2026
+"""
+
+import cv2
+import numpy as np
+
+class Renderer:
+    def __init__(self, labels=(), font_scale=0.5, font_thickness=2, max_patches=10000):
+        self._labels = labels
+        self._font = cv2.FONT_HERSHEY_SIMPLEX
+        self._font_scale = font_scale
+        self._font_thickness = font_thickness
+        self._max_patches = max_patches
+        self._patches = {}     # label text -> pre-rendered label patch
+        self._texts = {}       # (class, score in %) -> label text
+
+
+    def _patch(self, text):
+        """ Returns the label patch for a text and the text height, renders the patch on first use """
+        patch = self._patches.get(text)
+        if patch is None:
+            (width, height), base_line = cv2.getTextSize(text, self._font, self._font_scale, self._font_thickness)
+            patch = np.full((height + base_line + 1, width + 1, 3), 255, dtype=np.uint8)
+            cv2.putText(patch, text, (0, height + 3), self._font, self._font_scale, (0, 0, 0),
+                        self._font_thickness)
+            if len(self._patches) >= self._max_patches:
+                self._patches.clear()
+            patch = (patch, height)
+            self._patches[text] = patch
+        return patch
+
+
+    def _text(self, cls, score):
+        """ Returns the label text for a class and a score, e.g. 'paramecium: 87%' """
+        key = (cls, int(round(score * 100)))
+        text = self._texts.get(key)
+        if text is None:
+            text = self._labels[cls] + ": " + str(key[1]) + '%'
+            self._texts[key] = text
+        return text
+
+
+    def display_copy(self, frame, display_size):
+        """ Returns a downscaled copy of the frame that fits into display_size (width, height) """
+        height, width = frame.shape[:2]
+        factor = min(display_size[0] / width, display_size[1] / height)
+        if factor >= 1:
+            return frame.copy()
+        return cv2.resize(frame, (int(width * factor), int(height * factor)), interpolation=cv2.INTER_AREA)
+
+
+    def draw_boxes(self, frame, boxes, texts, colors, thickness=2):
+        """ Adds rectangles including labels to an image.
+            - 'boxes' is a list or array of boxes (ymin, xmin, ymax, xmax) with float values (0.0 - 1.0)
+            - 'texts' is a list of labels, an empty label means no label
+            - 'colors' is a list of colors or a single color tuple """
+        if len(boxes) == 0:
+            return frame
+        height, width = frame.shape[:2]
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        ymin = np.maximum(1, boxes[:, 0] * height).astype(int)
+        xmin = np.maximum(1, boxes[:, 1] * width).astype(int)
+        ymax = np.minimum(height, boxes[:, 2] * height).astype(int)
+        xmax = np.minimum(width, boxes[:, 3] * width).astype(int)
+        if isinstance(colors, tuple):
+            colors = [colors] * len(boxes)
+        for i in range(len(boxes)):
+            cv2.rectangle(frame, (int(xmin[i]), int(ymin[i])), (int(xmax[i]), int(ymax[i])), colors[i], thickness)
+        # Labels are drawn last, so that they are on top of all boxes
+        for i in range(len(boxes)):
+            if len(texts[i]) == 0:
+                continue
+            patch, text_height = self._patch(texts[i])
+            # Make sure not to draw label too close to top of window
+            top = max(int(ymin[i]), text_height + 10) - text_height - 10
+            left = int(xmin[i])
+            bottom, right = min(top + patch.shape[0], height), min(left + patch.shape[1], width)
+            if bottom > top and right > left:
+                frame[top:bottom, left:right] = patch[:bottom - top, :right - left]
+        return frame
+
+
+    def draw_detections(self, frame, boxes, classes, scores, threshold=0.5, color=(0, 255, 0),
+                        thickness=2, max_objects=10, display_size=None, inclusive=False):
+        """ Adds all detections above the threshold to a frame, including label and score.
+            With inclusive=True, detections with a score equal to the threshold are drawn as well
+            (as in the video analysis).
+            The detections are expected to be sorted by score, as returned by Detector.detect_objects().
+            If display_size (width, height) is given, the boxes are drawn on a downscaled copy of the frame,
+            which is returned. Otherwise the frame itself is changed and returned. """
+        if display_size is not None:
+            frame = self.display_copy(frame, display_size)
+        scores = np.asarray(scores[:max_objects])
+        # Count the leading scores above (or at) the threshold
+        above = scores >= threshold if inclusive else scores > threshold
+        cnt = int(np.cumprod(above).sum())
+        texts = [self._text(int(classes[i]), float(scores[i])) for i in range(cnt)]
+        return self.draw_boxes(frame, boxes[:cnt], texts, color, thickness)
@@ -0,0 +1,255 @@
+""" results_store.py
+
+Append-only storage of evaluation results, as used by 'evaluate_image_list.py'.
+The results of an image list are written to a folder in parts of 'chunk_images' images.
+Each part consists of three files:
+    part-00000.true.parquet     true objects (columns see summary.true_columns)
+    part-00000.est.parquet      estimated objects (columns see summary.est_columns)
+    part-00000.images.parquet   the images of the part (columns 'image', 'pos', 'true_cnt', 'est_cnt')
+The images file is written last and serves as checkpoint: a part without images file is incomplete
+and is removed when the run is resumed. So a crash or <ctrl-c> loses at most the images of one part,
+and the images of all complete parts are skipped when the run is resumed.
+Images that could not be read are not stored (ResultWriter.add_failed()), so they are tried again when the run is resumed.
+
+For runs on several machines, the images of a list are assigned to N shards by a hash of the image name.
+The folder of a shard is self-describing: meta.json holds the image list, the shard, the number of shards
+and the number of images of the shard, 'pos' is the position of an image in the image list.
+merge_results() combines the folders of all shards in the order of the image list,
+so the summary tables and error rankings are the same as for a run on one machine.
+
+Parquet requires pyarrow (or fastparquet). Without them, the parts are written as CSV files.
+
+Classes and functions:
+- ResultWriter - collects the results image by image and writes the parts
+- read_processed() - returns the set of images of all complete parts
+- read_results() - returns the true and estimated results of all complete parts as dataframes
+- shard_of() - returns the shard of an image
+- write_meta(), read_meta() - description of a results folder (meta.json)
+- merge_results() - returns the results of several folders (e.g. shards) as one run
+
+Dependencies: pandas, pyarrow (optional)
+
+SLW Oct-2026
+"""
+
+import os
+import glob
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+import summary
+
+image_columns = ['image', 'pos', 'true_cnt', 'est_cnt']
+
+
+def _parquet_available():
+    for module in ("pyarrow", "fastparquet"):
+        try:
+            __import__(module)
+            return True
+        except ImportError:
+            continue
+    return False
+
+
+file_type = "parquet" if _parquet_available() else "csv"
+
+
+def _write(df, file_name):
+    """ Writes a dataframe in one step (temporary file plus rename) """
+    tmp_name = file_name + ".tmp"
+    if file_name.endswith(".parquet"):
+        df.to_parquet(tmp_name, index=False)
+    else:
+        df.to_csv(tmp_name, index=False)
+    os.replace(tmp_name, file_name)
+
+
+def _read(file_name):
+    if file_name.endswith(".parquet"):
+        return pd.read_parquet(file_name)
+    return pd.read_csv(file_name, keep_default_na=False)
+
+
+def _parts(results_path):
+    """ Returns the names of the complete parts (e.g. 'part-00000.') in order """
+    # Only finished files: 'part-00000.images.parquet.tmp' is left by an interrupted flush
+    names = sorted(glob.glob(os.path.join(results_path, "part-*.images.parquet")) +
+                   glob.glob(os.path.join(results_path, "part-*.images.csv")))
+    return sorted(set(os.path.basename(name)[: -len("images." + name.rsplit('.', 1)[-1])] for name in names))
+
+
+def _file(results_path, part, kind):
+    for ft in ("parquet", "csv"):
+        file_name = os.path.join(results_path, part + kind + "." + ft)
+        if os.path.isfile(file_name):
+            return file_name
+    return None
+
+
+def read_processed(results_path):
+    """ Returns the set of images of all complete parts """
+    processed = set()
+    for part in _parts(results_path):
+        processed.update(_read(_file(results_path, part, "images"))['image'])
+    return processed
+
+
+def _read_parts(results_path):
+    """ Returns lists of dataframes (images, true, est) of all complete parts """
+    dfs = {"images": [], "true": [], "est": []}
+    for part in _parts(results_path):
+        for kind in dfs:
+            file_name = _file(results_path, part, kind)
+            if file_name is not None:
+                dfs[kind].append(_read(file_name))
+    return dfs["images"], dfs["true"], dfs["est"]
+
+
+def _combine(image_dfs, true_dfs, est_dfs, columns):
+    """ Concatenates the parts and sorts the rows in the order of the image list """
+    true_df = pd.concat(true_dfs, ignore_index=True) if len(true_dfs) > 0 else pd.DataFrame(columns=summary.true_columns)
+    est_df = pd.concat(est_dfs, ignore_index=True) if len(est_dfs) > 0 else pd.DataFrame(columns=summary.est_columns)
+    if len(image_dfs) > 0:
+        images = pd.concat(image_dfs, ignore_index=True)
+        # An image found twice (duplicate in the image list, or in two folders) keeps its first position
+        pos = images[~images['image'].duplicated()].set_index('image')['pos']
+        true_df = true_df.iloc[np.lexsort((true_df['true_idx'], true_df['image'].map(pos)))].reset_index(drop=True)
+        est_df = est_df.iloc[np.lexsort((est_df['est_idx'], est_df['image'].map(pos)))].reset_index(drop=True)
+    if columns is not None:
+        true_df, est_df = true_df[columns[0]], est_df[columns[1]]
+    return true_df, est_df
+
+
+def read_results(results_path, columns=None):
+    """ Returns the true results and the estimated results of all complete parts as dataframes.
+        'columns' can be used to keep only some columns (list of true columns, list of est columns). """
+    return _combine(*_read_parts(results_path), columns)
+
+
+def shard_of(image_name, shards):
+    """ Returns the shard (0 ... shards-1) of an image. The same on all machines and Python versions. """
+    return int(hashlib.md5(image_name.encode("utf-8")).hexdigest(), 16) % shards
+
+
+def write_meta(results_path, meta):
+    os.makedirs(results_path, exist_ok=True)
+    tmp_name = os.path.join(results_path, "meta.json.tmp")
+    with open(tmp_name, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_name, os.path.join(results_path, "meta.json"))
+
+
+def read_meta(results_path):
+    """ Returns the description of a results folder (empty dictionary if there is none) """
+    meta_file = os.path.join(results_path, "meta.json")
+    if not os.path.isfile(meta_file):
+        return {}
+    with open(meta_file, "r") as f:
+        return json.load(f)
+
+
+def merge_results(results_paths, columns=None):
+    """ Combines the results of several folders (e.g. the shards of a run) in the order of the image list.
+        Prints a warning for missing shards and incomplete folders.
+        Returns the true results, the estimated results and the description of the first folder. """
+    fname = "merge_results: "
+    metas = [read_meta(path) for path in results_paths]
+    image_dfs, true_dfs, est_dfs = [], [], []
+    for path, meta in zip(results_paths, metas):
+        if len(meta) == 0:
+            print(fname + "Warning: no meta.json in '" + path + "'")
+        elif meta.get('image_list') != metas[0].get('image_list') or meta.get('shards') != metas[0].get('shards'):
+            print(fname + "Warning: '" + path + "' is from another run (" + str(meta.get('image_list')) +
+                  ", " + str(meta.get('shards')) + " shards)")
+        images, trues, ests = _read_parts(path)
+        done = sum(len(df) for df in images)
+        if 'images' in meta and done < meta['images']:
+            print(fname + "Warning: '" + path + "' is incomplete (" + str(done) + " of " + str(meta['images']) + " images)")
+        image_dfs += images
+        true_dfs += trues
+        est_dfs += ests
+    shards = metas[0].get('shards', 1) if len(metas) > 0 else 1
+    missing = sorted(set(range(shards)) - set(meta.get('shard', 0) for meta in metas))
+    if len(missing) > 0:
+        print(fname + "Warning: shards missing: " + ", ".join(str(s) for s in missing))
+    if len(image_dfs) > 0:
+        images = pd.concat(image_dfs, ignore_index=True)['image']
+        if images.duplicated().any():
+            print(fname + "Warning: " + str(images.duplicated().sum()) + " images found in more than one folder")
+    true_df, est_df = _combine(image_dfs, true_dfs, est_dfs, columns)
+    return true_df, est_df, metas[0] if len(metas) > 0 else {}
+
+
+class ResultWriter:
+    """ Collects the results of the images and writes a part every 'chunk_images' images.
+        With 'resume', complete parts are kept and incomplete parts are removed;
+        otherwise all parts in the folder are removed. """
+
+    def __init__(self, results_path, chunk_images=500, resume=False, meta=None, label_names=()):
+        """ 'label_names' are the names of the label ids for add_arrays() (see Evaluator.label_names) """
+        self._path = results_path
+        self._label_names = label_names
+        self._chunk_images = chunk_images
+        os.makedirs(results_path, exist_ok=True)
+        if meta is not None:
+            write_meta(results_path, meta)
+        complete = set(_parts(results_path)) if resume else set()
+        for file_name in glob.glob(os.path.join(results_path, "part-*")):
+            base = os.path.basename(file_name)
+            if base.endswith(".tmp") or not any(base.startswith(part) for part in complete):
+                os.remove(file_name)
+        self.processed = read_processed(results_path) if resume else set()
+        self.failed = []
+        self._part_no = max([int(part[5:10]) for part in complete], default=-1) + 1
+        self._true_rows, self._est_rows, self._image_rows = [], [], []
+        self._true_arrays, self._est_arrays = [], []
+
+    def add(self, image_name, true_lst, est_lst, pos=0):
+        """ Adds the results of an image (as returned by Evaluator.evaluate_img()).
+            'pos' is the position of the image in the image list. """
+        self._true_rows.extend([image_name] + true_obj for true_obj in true_lst)
+        self._est_rows.extend([image_name] + est_obj for est_obj in est_lst)
+        self._image_rows.append([image_name, pos, len(true_lst), len(est_lst)])
+        self.processed.add(image_name)
+        if len(self._image_rows) >= self._chunk_images:
+            self.flush()
+
+    def add_arrays(self, image_name, true_arr, est_arr, pos=0):
+        """ Adds the results of an image as structured arrays (as returned by Evaluator.evaluate_arrays()).
+            The image id of the arrays must be 'pos', the position of the image in the image list. """
+        self._true_arrays.append(true_arr)
+        self._est_arrays.append(est_arr)
+        self._image_rows.append([image_name, pos, len(true_arr), len(est_arr)])
+        self.processed.add(image_name)
+        if len(self._image_rows) >= self._chunk_images:
+            self.flush()
+
+    def add_failed(self, image_name):
+        """ Records an image that could not be read. It is not stored and not added to the processed images,
+            so a resumed run tries it again. """
+        self.failed.append(image_name)
+
+    def flush(self):
+        """ Writes the collected results as a new part, the images file last """
+        if len(self._image_rows) == 0:
+            return
+        part = os.path.join(self._path, "part-" + str(self._part_no).zfill(5) + ".")
+        true_df = pd.DataFrame(self._true_rows, columns=summary.true_columns)
+        est_df = pd.DataFrame(self._est_rows, columns=summary.est_columns)
+        if len(self._true_arrays) > 0:
+            true_arr_df, est_arr_df = summary.from_arrays(np.concatenate(self._true_arrays),
+                                                          np.concatenate(self._est_arrays), self._label_names,
+                                                          {pos: name for name, pos, _, _ in self._image_rows})
+            true_df = true_arr_df if len(true_df) == 0 else pd.concat([true_df, true_arr_df], ignore_index=True)
+            est_df = est_arr_df if len(est_df) == 0 else pd.concat([est_df, est_arr_df], ignore_index=True)
+        _write(true_df, part + "true." + file_type)
+        _write(est_df, part + "est." + file_type)
+        _write(pd.DataFrame(self._image_rows, columns=image_columns), part + "images." + file_type)
+        self._part_no += 1
+        self._true_rows, self._est_rows, self._image_rows = [], [], []
+        self._true_arrays, self._est_arrays = [], []
+
+    def close(self):
+        self.flush()
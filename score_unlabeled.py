@@ -0,0 +1,166 @@
+""" score_unlabeled.py
+
+This script helps to choose the images to annotate next (hard-example mining).
+It runs the detector on all unlabeled images of a folder (images without XML file) and computes
+an uncertainty score per image from the detections:
+  - margin: how close the most uncertain detection is to the threshold (1 = at the threshold, 0 = far away)
+  - entropy: sum of the binary entropies of the detection scores (in bit), high for many scores around 0.5
+  - borderline: number of detections with a score between 'low_score' and 'high_score'
+The SSD models return one score per detection (the score of the best class), so the entropy is computed
+from the detection scores rather than from the full class distribution.
+
+The images are read by a pool of threads while the detector works on the previous batch.
+Only the 'top_k' images with the highest scores are kept in a heap, so the memory is constant for any number of images.
+The output is a ranked list in the format of test_images.txt (e.g. 'images/Snap-001.xml'),
+plus a CSV file with the scores of the listed images.
+
+SLW Oct-2026
+"""
+
+# Set files and paths ===================
+project_dir = "micro-organisms"
+image_dir = "unlabeled"
+model_dir = "model"
+output_list = "to_annotate.txt"
+server_address = None   # e.g. "localhost:8555" to use a shared detector server (see 'detector_server.py')
+method = "entropy"      # "margin", "entropy" or "borderline"
+top_k = 500
+threshold = 0.5         # detector threshold as used in the analysis
+low_score, high_score = 0.2, 0.8
+batch_size = 8
+read_workers = 4
+# =======================================
+
+import os
+import sys
+import heapq
+import concurrent.futures
+import numpy as np
+import cv2
+import detector
+import detector_server
+
+methods = ("margin", "entropy", "borderline")
+
+
+def unlabeled_images(image_path):
+    """ Yields the names of the image files without an XML file, in one pass over the folder """
+    images, labels = [], set()
+    with os.scandir(image_path) as it:
+        for entry in it:
+            name, ext = os.path.splitext(entry.name)
+            ext = ext.casefold()
+            if ext == ".xml":
+                labels.add(name)
+            elif ext in (".jpg", ".jpeg", ".png"):
+                images.append(entry.name)
+    for image_file in sorted(images):
+        if os.path.splitext(image_file)[0] not in labels:
+            yield image_file
+
+
+def uncertainty(scores, threshold=0.5, low_score=0.2, high_score=0.8):
+    """ Returns the uncertainty scores (margin, entropy, borderline) of the detection scores of an image """
+    scores = np.asarray(scores, dtype=np.float64)
+    scores = scores[scores >= low_score]
+    if len(scores) == 0:
+        return 0.0, 0.0, 0
+    margin = 1.0 - np.min(np.abs(scores - threshold)) / max(threshold, 1.0 - threshold)
+    p = np.clip(scores, 1e-6, 1.0 - 1e-6)
+    entropy = float(np.sum(-p * np.log2(p) - (1.0 - p) * np.log2(1.0 - p)))
+    borderline = int(np.count_nonzero(scores <= high_score))
+    return float(margin), entropy, borderline
+
+
+def _read(image_path, image_file):
+    return image_file, cv2.imread(os.path.join(image_path, image_file))
+
+
+def read_batches(image_path, image_files, batch_size, read_workers):
+    """ Yields batches of (image file, image), read by a pool of threads ahead of the detector """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=read_workers) as executor:
+        pending = []
+        for image_file in image_files:
+            pending.append(executor.submit(_read, image_path, image_file))
+            if len(pending) >= 2 * batch_size:
+                yield [f.result() for f in pending[:batch_size]]
+                pending = pending[batch_size:]
+        while len(pending) > 0:
+            yield [f.result() for f in pending[:batch_size]]
+            pending = pending[batch_size:]
+
+
+def score_images(dtc, image_path, image_files, method="entropy", top_k=500, threshold=0.5,
+                 low_score=0.2, high_score=0.8, batch_size=8, read_workers=4, verbose=True):
+    """ Scores the images and returns the 'top_k' images with the highest uncertainty,
+        as a list of tuples (image file, margin, entropy, borderline), highest first. """
+    key = methods.index(method)
+    heap = []
+    cnt = 0
+    for batch in read_batches(image_path, image_files, batch_size, read_workers):
+        found = [(image_file, img) for image_file, img in batch if img is not None]
+        for image_file, img in batch:
+            if img is None:
+                print("Error: can't read '" + image_file + "'. File skipped.")
+        if len(found) == 0:
+            continue
+        results = dtc.detect_objects_batch([img for _, img in found])
+        for (image_file, _), (_, _, scores) in zip(found, results):
+            figures = uncertainty(scores, threshold, low_score, high_score)
+            item = (figures[key], figures, image_file)
+            if len(heap) < top_k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+        cnt += len(found)
+        if verbose:
+            print("- " + str(cnt) + " images scored" + 10 * ' ', end='\r')
+    if verbose:
+        print(str(cnt) + " images scored" + 10 * ' ')
+    return [(image_file,) + figures for _, figures, image_file in sorted(heap, reverse=True)]
+
+
+def write_list(file_name, image_dir, ranked):
+    """ Writes the ranked images in the format of test_images.txt, plus a CSV file with the scores """
+    with open(file_name, "w") as f:
+        for image_file, *_ in ranked:
+            f.write(image_dir + "/" + os.path.splitext(image_file)[0] + ".xml\n")
+    with open(os.path.splitext(file_name)[0] + "_scores.csv", "w") as f:
+        f.write("image,margin,entropy,borderline\n")
+        for image_file, margin, entropy, borderline in ranked:
+            f.write(image_file + "," + str(round(margin, 4)) + "," + str(round(entropy, 4)) + "," + str(borderline) + "\n")
+
+
+#====================================================================================
+
+if __name__ == "__main__":
+
+    print("Score unlabeled images")
+    print(40 * "=")
+    print()
+
+    image_path = os.path.join(project_dir, image_dir)
+    if not os.path.isdir(image_path):
+        print("Error: can't find image path: '" + image_path + "' !")
+        sys.exit(1)
+    if method not in methods:
+        print("Error: unknown method '" + method + "', expected one of " + str(methods))
+        sys.exit(1)
+
+    print("Starting detector ...")
+    if server_address is None:
+        dtc = detector.Detector(os.path.join(project_dir, model_dir))
+    else:
+        dtc = detector_server.DetectorClient(server_address)
+
+    print("Scoring images by " + method + " ...")
+    ranked = score_images(dtc, image_path, unlabeled_images(image_path), method, top_k, threshold,
+                          low_score, high_score, batch_size, read_workers)
+    write_list(os.path.join(project_dir, output_list), image_dir, ranked)
+    print()
+    print("Image                                      Margin   Entropy  Borderline")
+    for image_file, margin, entropy, borderline in ranked[:10]:
+        print("{:40s} {:8.3f}  {:8.3f}  {:10d}".format(image_file, margin, entropy, borderline))
+    print()
+    print(len(ranked), "images written to '" + output_list + "'")
+    print("Done!")
@@ -0,0 +1,133 @@
+""" summary.py
+
+Functions to summarize evaluation results as produced by 'evaluate_image_list.py'.
+The results are two dataframes:
+  - true results with the columns 'image', 'true_idx', 'true_label', 'est_idx', 'est_label', 'score', 'intersection', 'match'
+  - estimated results with the columns 'image', 'est_idx', 'est_label', 'score', 'match'
+
+Functions:
+- summarize() - returns the figures for all classes and for each class
+- print_summary() - prints the summary tables for an image list
+- print_errors() - prints the images with the highest number of unmatched true objects
+- print_comparison() - prints the summaries of several models side by side
+- from_arrays() - converts the structured arrays of Evaluator.match_arrays() into the dataframes
+
+Dependencies: pandas
+
+SLW Oct-2026
+"""
+
+import numpy as np
+import pandas as pd
+
+true_columns = ['image', 'true_idx', 'true_label', 'est_idx', 'est_label', 'score', 'intersection', 'match']
+est_columns = ['image', 'est_idx', 'est_label', 'score', 'match']
+
+title_str = "True Obj     Matches  Correct Matches  Localization  Est.Obj  Not Matching"
+
+
+def from_arrays(true_arr, est_arr, label_names, image_names):
+    """ Converts structured arrays (see evaluator.true_dtype and evaluator.est_dtype) into the result dataframes.
+        'label_names' are the names of the label ids, 'image_names' maps the image ids to the image names
+        (a list or a dictionary). """
+    labels = np.array(list(label_names) + [""], dtype=object)   # label id -1: ""
+    if isinstance(image_names, dict):
+        ids = np.array(list(image_names.keys()), dtype=np.int64)
+        names = np.array(list(image_names.values()), dtype=object)
+        order = np.argsort(ids)
+        image_of = lambda a: names[order[np.searchsorted(ids, a, sorter=order)]]
+    else:
+        names = np.array(image_names, dtype=object)
+        image_of = lambda a: names[a]
+    true_df = pd.DataFrame({'image': image_of(true_arr['image']), 'true_idx': true_arr['true_idx'].astype(int),
+                            'true_label': labels[true_arr['true_label']], 'est_idx': true_arr['est_idx'].astype(int),
+                            'est_label': labels[true_arr['est_label']], 'score': true_arr['score'].astype(float),
+                            'intersection': true_arr['intersection'], 'match': true_arr['match']},
+                           columns=true_columns)
+    est_df = pd.DataFrame({'image': image_of(est_arr['image']), 'est_idx': est_arr['est_idx'].astype(int),
+                           'est_label': labels[est_arr['est_label']], 'score': est_arr['score'].astype(float),
+                           'match': est_arr['match']}, columns=est_columns)
+    return true_df, est_df
+
+
+def _figures(true_results, est_results):
+    true_cnt = len(true_results)
+    matches = true_results['match'].count()
+    correct = true_results[true_results['true_label'] == true_results['est_label']]['image'].count()
+    localization = true_results['intersection'].sum()
+    est_cnt = len(est_results)
+    matchless = est_results[est_results['match'] == False]['est_idx'].count()
+    return true_cnt, matches, correct, localization, est_cnt, matchless
+
+
+def summarize(true_results, est_results):
+    """ Returns a list of tuples (class, true count, matches, correct matches, localization sum,
+        estimated count, not matching). The first entry is for all classes (class None). """
+    rows = [(None,) + _figures(true_results, est_results)]
+    class_lst = true_results['true_label'].value_counts()
+    for c in class_lst.index:
+        rows.append((c,) + _figures(true_results[true_results['true_label'] == c],
+                                    est_results[est_results['est_label'] == c]))
+    return rows
+
+
+def _format(figures):
+    true_cnt, matches, correct, localization, est_cnt, matchless = figures
+    if true_cnt > 0 and matches > 0 and est_cnt > 0:
+        return "   {:5d}{:5d}/{:5.1f}%     {:5d}/{:5.1f}%        {:5.1f}%    {:5d}  {:5d}/{:5.1f}%".format(
+            true_cnt, matches, matches*100/true_cnt, correct, correct*100/true_cnt,
+            localization*100/matches, est_cnt, matchless, matchless*100/est_cnt)
+    return "   {:5d}           -                -             -    {:5d}             -".format(true_cnt, est_cnt)
+
+
+def print_summary(true_results, est_results, file_list):
+    """ Prints the summary for all classes and by class """
+    rows = summarize(true_results, est_results)
+    print()
+    print("Summary for '" + file_list + "'")
+    print((14 + len(file_list)) * '=')
+    print()
+    print("All classes " + 62 * '-')
+    print(title_str)
+    print(_format(rows[0][1:]))
+    print()
+    print("By class " + 85 * '-')
+    print("Class               " + title_str)
+    for row in rows[1:]:
+        print("{:20s}".format(row[0]) + _format(row[1:]))
+    print()
+
+
+def print_errors(true_results, n=10):
+    """ Prints the images with the highest number of unmatched true objects """
+    print("Test images with the highest number of errors:")
+    true_results_nomatch = true_results[true_results['match'] == False]
+    if len(true_results_nomatch) == 0:
+        print("None!")
+    else:
+        print(true_results_nomatch['image'].value_counts().head(n))
+    print()
+
+
+def print_comparison(results, file_list):
+    """ Prints the summaries of several models side by side.
+        'results' is a dictionary: model name -> (true results, estimated results) """
+    summaries = {model: summarize(t, e) for model, (t, e) in results.items()}
+    model_len = max(20, max(len(m) for m in results) + 1)
+    classes = []
+    for rows in summaries.values():
+        for row in rows:
+            if row[0] not in classes:
+                classes.append(row[0])
+    print()
+    print("Comparison for '" + file_list + "'")
+    print((17 + len(file_list)) * '=')
+    for c in classes:
+        print()
+        print(("All classes " if c is None else c + ' ') + 60 * '-')
+        print("Model".ljust(model_len) + title_str)
+        for model, rows in summaries.items():
+            figures = [row[1:] for row in rows if row[0] == c]
+            figures = figures[0] if len(figures) > 0 else (0, 0, 0, 0.0, 0, 0)
+            print(model.ljust(model_len) + _format(figures))
+    print()
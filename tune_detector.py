@@ -0,0 +1,98 @@
+""" tune_detector.py
+
+This script finds the fastest interpreter settings for a model on the current machine.
+It benchmarks the detector with different numbers of threads, with and without the XNNPACK delegate,
+and saves the fastest setting to "detect.tuning.json" in the model folder.
+The class Detector applies the setting automatically when the model is loaded on this machine.
+Settings for other machines (by host name) in the same file are kept.
+
+If the backend can't switch off XNNPACK, only the settings with XNNPACK are benchmarked.
+The benchmark uses the first image of the image folder, or a random image if there is none.
+
+SLW Oct-2026
+"""
+
+# Set files and paths ===================
+project_dir = "micro-organisms"
+image_dir = "images"
+model_dir = "model"
+warmup_runs = 5
+timed_runs = 30
+# =======================================
+
+import os
+import time
+import cv2
+import numpy as np
+import detector
+
+
+def benchmark(model_path, frame, num_threads, xnnpack, warmup_runs=5, timed_runs=30):
+    """ Returns the median time per detection in ms """
+    dtc = detector.Detector(model_path, verbose=False, num_threads=num_threads, xnnpack=xnnpack)
+    for _ in range(warmup_runs):
+        dtc.detect_objects(frame)
+    times = []
+    for _ in range(timed_runs):
+        start = time.perf_counter()
+        dtc.detect_objects(frame)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def thread_candidates():
+    """ 1, 2, 4, ... up to the number of cores, plus the number of cores itself """
+    cpu_cnt = os.cpu_count() or 1
+    lst = []
+    n = 1
+    while n < cpu_cnt:
+        lst.append(n)
+        n *= 2
+    return lst + [cpu_cnt]
+
+
+def tune(model_path, frame, warmup_runs=5, timed_runs=30, verbose=True):
+    """ Benchmarks all settings and saves the fastest one. Returns the fastest setting. """
+    best = None
+    xnnpack_options = (True, False) if detector.can_disable_xnnpack() else (True,)
+    if verbose and len(xnnpack_options) == 1:
+        print("The backend can't switch off XNNPACK, only settings with XNNPACK are tested.")
+    for xnnpack in xnnpack_options:
+        for num_threads in thread_candidates():
+            ms = benchmark(model_path, frame, num_threads, xnnpack, warmup_runs, timed_runs)
+            if verbose:
+                print("- threads: {:3d}  XNNPACK: {:5s}  {:8.2f} ms".format(num_threads, str(xnnpack), ms))
+            if best is None or ms < best['ms_per_frame']:
+                best = {'num_threads': num_threads, 'xnnpack': xnnpack, 'ms_per_frame': round(ms, 3)}
+    best['backend'] = detector.load_backend()[0]
+    best['cpu_count'] = os.cpu_count()
+    detector.save_tuning(model_path, best)
+    return best
+
+
+#====================================================================================
+
+if __name__ == "__main__":
+
+    model_path = os.path.join(project_dir, model_dir)
+    image_path = os.path.join(project_dir, image_dir)
+
+    print("Tuning detector in '" + model_path + "'")
+    print(40 * "=")
+    frame = None
+    if os.path.isdir(image_path):
+        for f in sorted(os.listdir(image_path)):
+            if f[f.rfind('.') + 1 :].casefold() in ("jpg", "jpeg", "png"):
+                frame = cv2.imread(os.path.join(image_path, f))
+                print("Using image:", f)
+                break
+    if frame is None:
+        print("Using a random image")
+        frame = np.random.default_rng(0).integers(0, 256, (768, 1024, 3), dtype=np.uint8)
+    print()
+    best = tune(model_path, frame, warmup_runs, timed_runs)
+    print()
+    print("Fastest setting: threads:", best['num_threads'], "/ XNNPACK:", best['xnnpack'],
+          "/", best['ms_per_frame'], "ms per frame")
+    print("Saved to", os.path.join(model_path, "detect.tuning.json"))
+    print("Done!")
@@ -0,0 +1,273 @@
+""" watch_folder.py
+
+This script watches a folder (e.g. the output folder of a microscope camera) and runs the detector on each new image.
+The results are appended to a JSON lines file in the folder (one line per image), which also records
+the processed images: after a restart, only the images that are not in the file are processed.
+
+New files are found with the package watchdog (inotify on Linux), if it is installed,
+otherwise by polling the folder every 'poll_interval' seconds.
+A file is processed when its size and modification time have not changed for 'settle_time' seconds,
+so files that are still being written are not read too early.
+The ready files are passed to the detector in batches (up to 'batch_size' files or 'max_wait' seconds).
+The latency from the arrival of a file to the result is shown in the status line.
+A file that can't be read is logged as failed (key 'error') and read again after 'retry_delay' seconds,
+up to 'max_retries' times. Failed files are not recorded as processed, so they are also retried after a restart.
+
+Stop the script with <ctrl-c>.
+
+Dependencies: OpenCV, watchdog (optional)
+
+SLW Oct-2026
+"""
+
+# Set files and paths ===================
+project_dir = "micro-organisms"
+watch_dir = "incoming"
+model_dir = "model"
+results_file = "detections.jsonl"
+server_address = None   # e.g. "localhost:8555" to use a shared detector server (see 'detector_server.py')
+threshold = 0.5
+settle_time = 0.25      # s without change before a file is processed
+poll_interval = 0.25    # s between two scans of the folder (without watchdog)
+batch_size = 8
+max_wait = 0.1          # s to wait for more files for a batch
+use_watchdog = True
+retry_delay = 5.0       # s before a file that can't be read is read again
+max_retries = 3
+# =======================================
+
+import os
+import sys
+import json
+import time
+import threading
+import cv2
+import numpy as np
+import detector
+import detector_server
+
+extensions = (".jpg", ".jpeg", ".png")
+
+
+class ResultLog:
+    """ Appends the results to a JSON lines file and keeps the set of processed files """
+
+    def __init__(self, file_name):
+        self._file_name = file_name
+        self.processed = set()
+        if os.path.isfile(file_name):
+            with open(file_name, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        if 'error' not in record:
+                            self.processed.add(record['file'])
+                    except (ValueError, KeyError):
+                        # e.g. a line cut by a crash
+                        continue
+        self._f = open(file_name, "a")
+
+    def append(self, records):
+        """ Writes the records (dictionaries with the key 'file') and flushes them to the disk.
+            Records with the key 'error' are failures and do not count as processed. """
+        for record in records:
+            self._f.write(json.dumps(record) + "\n")
+            if 'error' not in record:
+                self.processed.add(record['file'])
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self):
+        self._f.close()
+
+
+class FolderWatcher:
+    """ Finds new files in a folder and returns them when they are completely written """
+
+    def __init__(self, path, skip=(), settle_time=0.25, poll_interval=0.25, use_watchdog=True,
+                 retry_delay=5.0, max_retries=3, rescan_interval=60.0):
+        self._path = path
+        self._skip = skip               # set of file names not to be returned (e.g. processed files)
+        self._settle_time = settle_time
+        self._poll_interval = poll_interval
+        self._retry_delay = retry_delay
+        self._max_retries = max_retries
+        self._rescan_interval = rescan_interval     # with watchdog: scan to catch missed events and prune
+        self._lock = threading.Lock()
+        self._pending = {}              # file name -> (size, mtime, time of the last change, time of arrival)
+        self._returned = set()          # files returned by ready() (only files still in the folder)
+        self._retries = {}              # file name -> (number of failures, time of the next try)
+        self._observer = None
+        self._last_scan = 0.0
+        self.mode = "polling"
+        if use_watchdog:
+            try:
+                from watchdog.observers import Observer
+                from watchdog.events import FileSystemEventHandler
+            except ImportError:
+                print("watchdog not installed, polling the folder every", poll_interval, "s")
+            else:
+                watcher = self
+
+                class Handler(FileSystemEventHandler):
+                    def on_any_event(self, event):
+                        if not event.is_directory:
+                            watcher._notify(event.src_path)
+                            if getattr(event, 'dest_path', ''):
+                                watcher._notify(event.dest_path)
+
+                self._observer = Observer()
+                self._observer.schedule(Handler(), path, recursive=False)
+                self._observer.start()
+                self.mode = "watchdog"
+        # Files that arrived while the script was not running
+        self._scan()
+
+    def _notify(self, file_path):
+        name = os.path.basename(file_path)
+        if name.casefold().endswith(extensions) and name not in self._skip:
+            with self._lock:
+                if not os.path.isfile(os.path.join(self._path, name)):
+                    # removed or renamed: it may come back as a new file
+                    self._returned.discard(name)
+                    self._retries.pop(name, None)
+                elif name not in self._pending and name not in self._returned:
+                    now = time.time()
+                    self._pending[name] = (-1, -1, now, now)
+
+    def _scan(self):
+        names = set()
+        with os.scandir(self._path) as it:
+            for entry in it:
+                if entry.is_file():
+                    names.add(entry.name)
+                    self._notify(entry.name)
+        with self._lock:
+            # Keep only the files still in the folder
+            self._returned &= names
+            self._retries = {name: retry for name, retry in self._retries.items() if name in names}
+        self._last_scan = time.time()
+
+    def retry(self, name):
+        """ Returns a file that could not be read to the watcher. It is returned by ready() again after
+            retry_delay, up to max_retries times. Returns False if the file is not retried any more. """
+        with self._lock:
+            failures = self._retries.get(name, (0, 0))[0] + 1
+            if failures > self._max_retries:
+                return False
+            self._retries[name] = (failures, time.time() + self._retry_delay)
+            return True
+
+    def ready(self):
+        """ Returns the list of (file name, time of arrival) of the files that have not changed for settle_time """
+        interval = self._poll_interval if self._observer is None else self._rescan_interval
+        if time.time() - self._last_scan >= interval:
+            self._scan()
+        ready = []
+        now = time.time()
+        with self._lock:
+            for name, (failures, due) in self._retries.items():
+                if 0 < due <= now and name not in self._pending:
+                    self._returned.discard(name)
+                    self._pending[name] = (-1, -1, now, now)
+                    self._retries[name] = (failures, 0)
+            for name, (size, mtime, changed, arrived) in list(self._pending.items()):
+                try:
+                    st = os.stat(os.path.join(self._path, name))
+                except OSError:
+                    # removed or renamed
+                    del self._pending[name]
+                    continue
+                if (st.st_size, st.st_mtime) != (size, mtime):
+                    self._pending[name] = (st.st_size, st.st_mtime, now, arrived)
+                elif now - changed >= self._settle_time and st.st_size > 0:
+                    ready.append((name, arrived))
+                    del self._pending[name]
+                    self._returned.add(name)
+        return sorted(ready, key=lambda r: r[1])
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+
+
+def _records(labels, batch, results, threshold):
+    records = []
+    for (name, arrived, img), (boxes, classes, scores) in zip(batch, results):
+        keep = [i for i in range(len(scores)) if scores[i] >= threshold]
+        records.append({'file': name, 'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+                        'width': img.shape[1], 'height': img.shape[0],
+                        'labels': [labels[classes[i]] for i in keep],
+                        'scores': [round(float(scores[i]), 4) for i in keep],
+                        'boxes': [[round(float(v), 4) for v in boxes[i]] for i in keep]})
+    return records
+
+
+def watch(dtc, watcher, log, image_path, threshold=0.5, batch_size=8, max_wait=0.1, verbose=True):
+    """ Processes the new files until <ctrl-c> """
+    latencies = []
+    queue = []
+    while True:
+        queue += watcher.ready()
+        if len(queue) == 0:
+            time.sleep(0.02)
+            continue
+        # Wait a little for more files, unless the batch is full
+        deadline = time.time() + max_wait
+        while len(queue) < batch_size and time.time() < deadline:
+            time.sleep(0.01)
+            queue += watcher.ready()
+        batch, queue = queue[:batch_size], queue[batch_size:]
+        images = []
+        for name, arrived in batch:
+            img = cv2.imread(os.path.join(image_path, name))
+            if img is None:
+                retried = watcher.retry(name)
+                print("Error: can't read '" + name + "'." + (" Retrying later." if retried else " File skipped."))
+                log.append([{'file': name, 'time': time.strftime("%Y-%m-%d %H:%M:%S"), 'error': "can't read file"}])
+                continue
+            images.append((name, arrived, img))
+        if len(images) == 0:
+            continue
+        results = dtc.detect_objects_batch([img for _, _, img in images])
+        log.append(_records(dtc.labels, images, results, threshold))
+        now = time.time()
+        latencies = (latencies + [now - arrived for _, arrived, _ in images])[-1000:]
+        if verbose:
+            print("{} images processed, latency p50 {:.2f} s, max {:.2f} s".format(
+                len(log.processed), float(np.median(latencies)), max(latencies)) + 10 * ' ', end='\r')
+
+
+#====================================================================================
+
+if __name__ == "__main__":
+
+    print("Watch folder")
+    print(40 * "=")
+    print()
+
+    image_path = os.path.join(project_dir, watch_dir)
+    if not os.path.isdir(image_path):
+        print("Error: can't find folder: '" + image_path + "' !")
+        sys.exit(1)
+
+    print("Starting detector ...")
+    if server_address is None:
+        dtc = detector.Detector(os.path.join(project_dir, model_dir))
+    else:
+        dtc = detector_server.DetectorClient(server_address)
+
+    log = ResultLog(os.path.join(image_path, results_file))
+    print(len(log.processed), "images already processed")
+    watcher = FolderWatcher(image_path, log.processed, settle_time, poll_interval, use_watchdog,
+                            retry_delay, max_retries)
+    print("Watching '" + image_path + "' (" + watcher.mode + "), press <ctrl-c> to stop.")
+    try:
+        watch(dtc, watcher, log, image_path, threshold, batch_size, max_wait)
+    except KeyboardInterrupt:
+        pass
+    watcher.stop()
+    log.close()
+    print()
+    print("Done!")